@@ -0,0 +1,114 @@
+""" Page latency of a layout fetching from several slow data sources,
+sequentially in a sync layout and concurrently in an async one
+
+The data source sleeps to simulate a local service with fixed latency. Requests
+are made through the flask test client from a pool of threads, so each request
+still holds a thread while it waits; the async win is in per request latency.
+
+Run with:
+python benchmarks/bench_async.py
+"""
+
+from concurrent import futures
+import asyncio
+import os
+import sys
+import time
+
+import dash
+import dash_html_components as html
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from dash_multipage import ControllerBase, LinkInfo, MultiPageDashController
+
+SOURCES = 5
+LATENCY = 0.02
+REQUESTS = 200
+THREADS = 8
+
+
+def fetch_sync(source: int) -> str:
+    """ Simulated blocking data source """
+    time.sleep(LATENCY)
+    return 'data {}'.format(source)
+
+
+async def fetch_async(source: int) -> str:
+    """ Simulated non-blocking data source """
+    await asyncio.sleep(LATENCY)
+    return 'data {}'.format(source)
+
+
+class SyncPage(ControllerBase):
+    """ Page fetching its sources one after another """
+
+    def layout(self, args):
+        return html.Div([html.P(fetch_sync(i)) for i in range(SOURCES)])
+
+    @staticmethod
+    def get_link_info() -> LinkInfo:
+        return LinkInfo('Sync', '/sync', 'sync')
+
+    def register_callbacks(self, app):
+        pass
+
+
+class AsyncPage(ControllerBase):
+    """ Page fetching its sources concurrently """
+
+    async def layout(self, args):  # pylint: disable=invalid-overridden-method
+        data = await asyncio.gather(*(fetch_async(i) for i in range(SOURCES)))
+        return html.Div([html.P(item) for item in data])
+
+    def skeleton(self):
+        return html.Div()
+
+    @staticmethod
+    def get_link_info() -> LinkInfo:
+        return LinkInfo('Async', '/async', 'async')
+
+    def register_callbacks(self, app):
+        pass
+
+
+def measure(client_factory, path):
+    """ Return the throughput and p50 and p99 latency in ms for a page """
+    def request(_):
+        client = client_factory()
+        start = time.perf_counter()
+        response = client.post('/_dash-update-component', json={
+            'output': 'page-content.children',
+            'outputs': {'id': 'page-content', 'property': 'children'},
+            'inputs': [{'id': 'url', 'property': 'href',
+                        'value': 'http://localhost' + path}],
+            'changedPropIds': ['url.href']})
+        assert response.status_code == 200
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with futures.ThreadPoolExecutor(THREADS) as pool:
+        latencies = sorted(pool.map(request, range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    return (REQUESTS / elapsed, latencies[len(latencies) // 2] * 1e3,
+            latencies[int(0.99 * (len(latencies) - 1))] * 1e3)
+
+
+def main():
+    app = dash.Dash(__name__)
+    page_ctrl = MultiPageDashController(
+        app, [SyncPage(), AsyncPage()], html.Div('Not found'))
+    app.server.test_client().get('/')
+    print('{} sources of {:.0f} ms, {} threads'.format(
+        SOURCES, LATENCY * 1e3, THREADS))
+    print('{:<8} {:>10} {:>10} {:>10}'.format(
+        'layout', 'req/s', 'p50 (ms)', 'p99 (ms)'))
+    for name, path in (('sync', '/sync'), ('async', '/async')):
+        rate, p50, p99 = measure(app.server.test_client, path)
+        print('{:<8} {:>10.0f} {:>10.1f} {:>10.1f}'.format(name, rate, p50, p99))
+    page_ctrl.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+""" End to end throughput and latency of a synthetic multipage app
+
+Builds an app with a configurable number of pages, each with URLArgs linked
+components and callbacks, and drives it through the flask test client from a
+thread pool. Each scenario reports throughput and latency percentiles, and the
+results can be written as JSON and compared with an earlier run.
+
+Run with:
+python benchmarks/bench_e2e.py --out results.json
+python benchmarks/bench_e2e.py --baseline results.json
+python benchmarks/bench_e2e.py --compress
+"""
+
+from concurrent import futures
+from typing import Callable, Dict, List
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+import dash
+import dash_core_components as dcc
+import dash_html_components as html
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position,protected-access
+from dash_multipage import (Compressor, ControllerBase, Input, LinkInfo,
+                            MultiPageDashController, NavCallbackMode, Output,
+                            URLArgs, ValueTypes)
+from dash_multipage.url_arg_manager import parse_href
+
+HOST = 'http://localhost'
+UPDATE_PATH = '/_dash-update-component'
+CHOICES = ['alpha', 'beta', 'gamma', 'delta']
+
+
+class SyntheticPage(ControllerBase):
+    """ Page with components cycling through text inputs, dropdowns and multi
+        select dropdowns, and callbacks each showing one of their values
+    """
+    update_in_place = True
+
+    def __init__(self, index: int, components: int, callbacks: int):
+        self.link_info = LinkInfo('Page {}'.format(index),
+                                  '/page{}'.format(index),
+                                  'page{}'.format(index))
+        self.callbacks = callbacks
+        namespace = self.link_info.page_link_id
+        self.url_args = URLArgs(namespace, HOST + self.link_info.page_path)
+        self.inputs = []
+        options = [{'label': choice, 'value': choice} for choice in CHOICES]
+        for i in range(components):
+            component_id = '{}/input-{}'.format(namespace, i)
+            kind = i % 3
+            if kind == 0:
+                component = dcc.Input(id=component_id, type='text')
+                self.url_args.register_component(component, default='text')
+            elif kind == 1:
+                component = dcc.Dropdown(id=component_id, options=options)
+                self.url_args.register_component(component, default='alpha')
+            else:
+                component = dcc.Dropdown(id=component_id, options=options,
+                                         multi=True)
+                self.url_args.register_component(
+                    component, default=['alpha'],
+                    value_type=ValueTypes.STR_LIST)
+            self.inputs.append(component)
+        self.outputs = [html.Div(id='{}/output-{}'.format(namespace, i))
+                        for i in range(callbacks)]
+
+    def random_values(self, rng: random.Random) -> Dict[str, object]:
+        """ Return random values for the page's URLArgs keyed by arg name
+        """
+        values: Dict[str, object] = {}
+        for i, component in enumerate(self.inputs):
+            key = self.url_args._get_key(component.id)
+            if i % 3 == 0:
+                values[key] = 'text {}'.format(rng.randint(0, 1000))
+            elif i % 3 == 1:
+                values[key] = rng.choice(CHOICES)
+            else:
+                values[key] = rng.sample(CHOICES, rng.randint(1, 3))
+        return values
+
+    def layout(self, args: Dict):
+        components = self.url_args.get_initialized_components(args)
+        return html.Div(
+            [html.H2(self.link_info.link_text),
+             self.url_args.generate_link_box()] +
+            [components[component.id] for component in self.inputs] +
+            self.outputs)
+
+    def get_link_info(self) -> LinkInfo:  # type: ignore # pylint: disable=arguments-differ
+        return self.link_info
+
+    def register_callbacks(self, app):
+        self.url_args.register_callbacks(app)
+        for i, output in enumerate(self.outputs):
+            component = self.inputs[i % len(self.inputs)]
+
+            @app.callback(Output(output, 'children'),
+                          [Input(component, 'value')])
+            def _show_value(value):
+                return 'Selected {}'.format(value)
+
+
+def build(args):
+    """ Return the app, controller and pages """
+    # Dash's own Flask-Compress compression would hide the Compressor's
+    app = dash.Dash(__name__, compress=False)
+    pages = [SyntheticPage(i, args.components, args.callbacks)
+             for i in range(args.controllers)]
+    page_ctrl = MultiPageDashController(
+        app, pages, html.Div('Not found'),
+        nav_callback_mode=NavCallbackMode[args.nav_mode],
+        health_path=None,
+        compressor=Compressor() if args.compress else None)
+    return app, page_ctrl, pages
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    """ Return the mean and percentiles of latencies in milliseconds """
+    latencies = sorted(latencies)
+    result = {'mean_ms': sum(latencies) / len(latencies) * 1e3}
+    for quantile in (50, 90, 99):
+        index = int(quantile / 100 * (len(latencies) - 1))
+        result['p{}_ms'.format(quantile)] = latencies[index] * 1e3
+    return result
+
+
+def run(operation: Callable[[random.Random, object], bool], requests: int,
+        threads: int, make_client: Callable[[], object]) -> Dict[str, float]:
+    """ Call operation requests times from a pool of threads, each with its
+        own client and random generator, and return its throughput, latency
+        percentiles and error count
+    """
+    local = threading.local()
+
+    def timed(seed):
+        if not hasattr(local, 'client'):
+            local.client = make_client()
+            local.rng = random.Random(seed)
+        start = time.perf_counter()
+        ok = operation(local.rng, local.client)
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with futures.ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(timed, range(requests)))
+    elapsed = time.perf_counter() - start
+    stats = {'requests': requests,
+             'errors': sum(1 for _, ok in results if not ok),
+             'throughput_rps': requests / elapsed}
+    stats.update(percentiles([latency for latency, _ in results]))
+    return stats
+
+
+def scenarios(app, pages, headers: Dict[str, str]) -> Dict[str, Callable]:
+    """ Return the operations to benchmark keyed by name """
+
+    def post(client, body) -> bool:
+        response = client.post(UPDATE_PATH, json=body, headers=headers)
+        return response.status_code in (200, 204)
+
+    def random_url(rng, page):
+        return page.url_args._generate_url(page.random_values(rng))
+
+    def navigate(rng, client, same_route=False):
+        page = rng.choice(pages)
+        current_route = page.link_info.page_path if same_route else None
+        return post(client, {
+            'output': '..page-content.children...page-route.data..',
+            'outputs': [{'id': 'page-content', 'property': 'children'},
+                        {'id': 'page-route', 'property': 'data'}],
+            'inputs': [{'id': 'url', 'property': 'href',
+                        'value': random_url(rng, page)}],
+            'state': [{'id': 'page-route', 'property': 'data',
+                       'value': current_route}],
+            'changedPropIds': ['url.href']})
+
+    def query_change(rng, client):
+        # The page is already shown, so the router skips rendering it. The
+        # page's in place update callback is a separate request.
+        return navigate(rng, client, same_route=True)
+
+    nav_callbacks = [
+        (output, callback) for output, callback in app.callback_map.items()
+        if callback['inputs'] == [{'id': 'url', 'property': 'pathname'}]]
+
+    def nav_links(rng, client):
+        output, _ = rng.choice(nav_callbacks)
+        page = rng.choice(pages)
+        outputs = [dict(zip(('id', 'property'), out.rsplit('.', 1)))
+                   for out in output.strip('.').split('...')]
+        return post(client, {
+            'output': output,
+            'outputs': outputs if output.startswith('..') else outputs[0],
+            'inputs': [{'id': 'url', 'property': 'pathname',
+                        'value': page.link_info.page_path}],
+            'changedPropIds': ['url.pathname']})
+
+    def link_box(rng, client):
+        page = rng.choice(pages)
+        values = page.random_values(rng)
+        output = page.url_args.link_id + '.value'
+        callback = app.callback_map[output]
+        return post(client, {
+            'output': output,
+            'outputs': {'id': page.url_args.link_id, 'property': 'value'},
+            'inputs': [dict(dep, value=values[
+                page.url_args._get_key(dep['id'])])
+                       for dep in callback['inputs']],
+            'changedPropIds': [callback['inputs'][0]['id'] + '.value']})
+
+    def url_round_trip(rng, _client):
+        page = rng.choice(pages)
+        values = page.random_values(rng)
+        _, args = parse_href(page.url_args._generate_url(values))
+        return page.url_args.decode(args) == values
+
+    result = {
+        'navigate': navigate,
+        'query_change': query_change,
+        'link_box': link_box,
+        'url_round_trip': url_round_trip,
+    }
+    if nav_callbacks:
+        result['nav_links'] = nav_links
+    return result
+
+
+def compare(results: Dict, baseline: Dict) -> None:
+    """ Print the change from a baseline run for each scenario """
+    print('{:<16} {:>12} {:>12} {:>9}'.format(
+        'scenario', 'p50 (ms)', 'base (ms)', 'change'))
+    for name, stats in results['scenarios'].items():
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            continue
+        print('{:<16} {:>12.3f} {:>12.3f} {:>+8.1f}%'.format(
+            name, stats['p50_ms'], base['p50_ms'],
+            (stats['p50_ms'] / base['p50_ms'] - 1) * 100))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--controllers', type=int, default=8)
+    parser.add_argument('--components', type=int, default=6)
+    parser.add_argument('--callbacks', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--nav-mode', default='PER_PAGE',
+                        choices=[mode.name for mode in NavCallbackMode])
+    parser.add_argument('--scenario', action='append',
+                        help='only run these scenarios')
+    parser.add_argument('--compress', action='store_true',
+                        help='compress responses and report the compression '
+                             'ratio and CPU time per scenario')
+    parser.add_argument('--out', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    args = parser.parse_args()
+
+    app, page_ctrl, pages = build(args)
+    compressor = page_ctrl.compressor
+    headers = {'Accept-Encoding': 'br, gzip'} if args.compress else {}
+    # The first request sets up the dash server
+    app.server.test_client().get('/')
+    results = {'config': vars(args).copy(),
+               'dash_version': dash.__version__,
+               'scenarios': {}}
+    for key in ('out', 'baseline', 'scenario'):
+        results['config'].pop(key)
+    print('{:<16} {:>10} {:>10} {:>10} {:>10} {:>7}{}'.format(
+        'scenario', 'req/s', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)', 'errors',
+        ' {:>7} {:>11}'.format('ratio', 'cpu/resp us') if compressor else ''))
+    for name, operation in scenarios(app, pages, headers).items():
+        if args.scenario and name not in args.scenario:
+            continue
+        before = compressor.stats() if compressor else None
+        stats = run(operation, args.requests, args.threads,
+                    app.server.test_client)
+        extra = ''
+        if compressor:
+            after = compressor.stats()
+            responses = after['responses'] - before['responses']
+            bytes_out = after['bytes_out'] - before['bytes_out']
+            stats['compression_ratio'] = (
+                (after['bytes_in'] - before['bytes_in']) / bytes_out
+                if bytes_out else 0.0)
+            stats['compression_cpu_us'] = (
+                (after['cpu_seconds'] - before['cpu_seconds']) / responses *
+                1e6 if responses else 0.0)
+            extra = ' {:>7.2f} {:>11.1f}'.format(stats['compression_ratio'],
+                                                stats['compression_cpu_us'])
+        results['scenarios'][name] = stats
+        print('{:<16} {:>10.0f} {:>10.3f} {:>10.3f} {:>10.3f} {:>7}{}'.format(
+            name, stats['throughput_rps'], stats['p50_ms'], stats['p90_ms'],
+            stats['p99_ms'], stats['errors'], extra))
+    if args.out:
+        with open(args.out, 'w') as out_file:
+            json.dump(results, out_file, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            compare(results, json.load(baseline_file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+""" Microbenchmark of page dispatch: RouteTable vs a linear scan of controllers
+
+Run with:
+python benchmarks/bench_routing.py
+"""
+
+import sys
+import os
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dash_multipage import LinkInfo  # pylint: disable=wrong-import-position
+from dash_multipage.routing import RouteTable  # pylint: disable=wrong-import-position
+
+
+class FakeCtrl:
+    """ Minimal stand in for a controller """
+
+    def __init__(self, page_path):
+        self._link_info = LinkInfo(page_path, page_path, page_path)
+
+    def get_link_info(self):
+        """ Link information """
+        return self._link_info
+
+
+def linear_dispatch(ctrls, route):
+    """ The dispatch loop used before RouteTable """
+    for ctrl in ctrls:
+        if route == ctrl.get_link_info().page_path:
+            return ctrl
+    return None
+
+
+def main():
+    print('{:>6} {:>14} {:>14} {:>14}'.format(
+        'routes', 'linear (us)', 'static (us)', 'pattern (us)'))
+    for count in (10, 100, 1000):
+        ctrls = [FakeCtrl('/page{}'.format(i)) for i in range(count)]
+        ctrls += [FakeCtrl('/runs{}/<run_id>'.format(i)) for i in range(count)]
+        table = RouteTable()
+        for ctrl in ctrls:
+            table.add(ctrl.get_link_info().page_path, ctrl)
+        # Worst case for the linear scan is the last static page
+        route = '/page{}'.format(count - 1)
+        pattern_route = '/runs{}/1234'.format(count - 1)
+        number = 2000
+        linear = timeit.timeit(
+            lambda: linear_dispatch(ctrls, route), number=number)
+        static = timeit.timeit(lambda: table.match(route), number=number)
+        pattern = timeit.timeit(
+            lambda: table.match(pattern_route), number=number)
+        print('{:>6} {:>14.3f} {:>14.3f} {:>14.3f}'.format(
+            count, linear / number * 1e6, static / number * 1e6,
+            pattern / number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+""" Per-request CPU time and response bytes for the layout endpoint and 404
+page, with and without the pre-serialised fragments
+
+Run with:
+python benchmarks/bench_static_layout.py
+"""
+
+import sys
+import os
+import time
+
+import dash
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'example'))
+
+# pylint: disable=wrong-import-position,protected-access
+from dash_multipage import MultiPageDashController
+from app1 import App1
+from app2 import App2
+from footer import render_footer
+from error_404 import render_404
+
+REQUESTS = 500
+
+
+def build():
+    """ Return the example app and controller """
+    app = dash.Dash(__name__)
+    page_ctrl = MultiPageDashController(
+        app, [App1('http://localhost'), App2('http://localhost')],
+        render_404(), render_footer())
+    return app, page_ctrl
+
+
+def measure(func):
+    """ Return the CPU microseconds per call and the response size """
+    response = func()
+    start = time.process_time()
+    for _ in range(REQUESTS):
+        func()
+    cpu = (time.process_time() - start) / REQUESTS * 1e6
+    return cpu, len(response.data)
+
+
+def main():
+    app, page_ctrl = build()
+    client = app.server.test_client()
+    client.get('/')
+
+    def not_found():
+        return client.post('/_dash-update-component', json={
+            'output': 'page-content.children',
+            'outputs': {'id': 'page-content', 'property': 'children'},
+            'inputs': [{'id': 'url', 'property': 'href',
+                        'value': 'http://localhost/missing'}],
+            'changedPropIds': ['url.href']})
+
+    def layout():
+        return client.get('/_dash-layout')
+
+    etag = layout().headers['ETag']
+
+    def layout_conditional():
+        return client.get('/_dash-layout', headers={'If-None-Match': etag})
+
+    results = [
+        ('layout (cached)', measure(layout)),
+        ('layout (304)', measure(layout_conditional)),
+        ('404 (cached)', measure(not_found)),
+    ]
+    # Disable the pre-serialised fragments for the baseline
+    app.server.view_functions['/_dash-layout'] = app.serve_layout
+    page_ctrl._error_404_json = page_ctrl.error_404
+    results += [
+        ('layout (dash)', measure(layout)),
+        ('404 (dash)', measure(not_found)),
+    ]
+    print('{:<16} {:>12} {:>10}'.format('request', 'cpu (us)', 'bytes'))
+    for name, (cpu, size) in results:
+        print('{:<16} {:>12.1f} {:>10}'.format(name, cpu, size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+""" Throughput of URLArgs decode/encode for pages with many linked components
+
+The baseline functions reproduce the per-call loops URLArgs used before the
+compiled schema.
+
+Run with:
+python benchmarks/bench_url_args.py
+"""
+
+import sys
+import os
+import json
+import timeit
+from urllib import parse
+
+import dash_core_components as dcc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dash_multipage import URLArgs  # pylint: disable=wrong-import-position
+from dash_multipage.url_arg_manager import ValueTypes  # pylint: disable=wrong-import-position
+
+TYPES = [ValueTypes.STR, ValueTypes.STR_LIST, ValueTypes.INT,
+         ValueTypes.FLOAT, ValueTypes.DICT]
+
+
+def baseline_decode(url_args, args_dict):
+    """ Decoding as done by initialize_components before the schema """
+    values = []
+    for info in url_args.linked_components:
+        key = info.component.id.split('/')[-1]
+        value = info.default
+        try:
+            str_list = args_dict[key]
+            if info.value_type == ValueTypes.STR_LIST:
+                value = str_list
+            else:
+                str_val = str_list[-1]
+                if info.value_type == ValueTypes.STR:
+                    value = str_val
+                else:
+                    try:
+                        if info.value_type == ValueTypes.INT:
+                            value = float(str_val)
+                        elif info.value_type == ValueTypes.FLOAT:
+                            value = float(str_val)
+                        elif info.value_type == ValueTypes.DICT:
+                            value = json.loads(str_val.replace("'", '"'))
+                    except (ValueError, json.JSONDecodeError):
+                        pass
+        except KeyError:
+            pass
+        values.append(value)
+    return values
+
+
+def baseline_encode(kwargs):
+    """ Encoding as done by _generate_url before the schema """
+    tuples = ()
+    for k, vals in kwargs.items():
+        if vals is None:
+            continue
+        if not isinstance(vals, list):
+            vals = [vals]
+        for val in vals:
+            tuples = tuples + ((k, val),)
+    return parse.urlencode(tuples)
+
+
+def build(count, list_len):
+    """ Return a URLArgs with count components and matching values """
+    url_args = URLArgs('bench', 'http://localhost:5000/bench')
+    values = {}
+    for i in range(count):
+        value_type = TYPES[i % len(TYPES)]
+        key = 'arg{}'.format(i)
+        url_args.register_component(
+            dcc.Input(id='bench/' + key), value_type=value_type)
+        if value_type == ValueTypes.STR_LIST:
+            values[key] = ['id{}'.format(j) for j in range(list_len)]
+        elif value_type == ValueTypes.DICT:
+            values[key] = {'filter': key, 'limit': i}
+        elif value_type == ValueTypes.STR:
+            values[key] = 'value {}'.format(i)
+        else:
+            values[key] = i
+    return url_args, values
+
+
+def main():
+    print('{:>10} {:>9} {:>16} {:>16} {:>16} {:>16}'.format(
+        'components', 'list len', 'old decode/s', 'new decode/s',
+        'old encode/s', 'new encode/s'))
+    for count, list_len in ((10, 10), (100, 100), (500, 100), (500, 300)):
+        url_args, values = build(count, list_len)
+        args_dict = parse.parse_qs(url_args.encode(values))
+        number = max(3, 1000 // count)
+        old_decode = timeit.timeit(
+            lambda: baseline_decode(url_args, args_dict), number=number)
+        new_decode = timeit.timeit(
+            lambda: url_args.decode(args_dict), number=number)
+        old_encode = timeit.timeit(
+            lambda: baseline_encode(values), number=number)
+        new_encode = timeit.timeit(
+            lambda: url_args.encode(values), number=number)
+        print('{:>10} {:>9} {:>16.1f} {:>16.1f} {:>16.1f} {:>16.1f}'.format(
+            count, list_len, number / old_decode, number / new_decode,
+            number / old_encode, number / new_encode))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+""" URL size and encode/decode speed of the PLAIN and COMPACT URLArgs encodings
+
+Run with:
+python benchmarks/bench_url_state.py
+"""
+
+import sys
+import os
+import timeit
+
+import dash_core_components as dcc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from dash_multipage import URLArgs, URLEncoding, ValueTypes
+from dash_multipage.url_arg_manager import parse_href
+
+
+def build(encoding, id_count):
+    """ Return a URLArgs for a page with a filter dict and multi-select list,
+        and values for it
+    """
+    url_args = URLArgs('bench', 'http://localhost:5000/bench',
+                       encoding=encoding)
+    url_args.register_component(
+        dcc.Dropdown(id='bench/runs'), value_type=ValueTypes.STR_LIST)
+    url_args.register_component(
+        dcc.Input(id='bench/filters'), value_type=ValueTypes.DICT)
+    url_args.register_component(dcc.Input(id='bench/title'))
+    values = {
+        'runs': ['run-{:08d}'.format(i) for i in range(id_count)],
+        'filters': {'site{}'.format(i): ['north', 'south', i]
+                    for i in range(id_count // 10)},
+        'title': 'Weekly summary',
+    }
+    return url_args, values
+
+
+def main():
+    print('{:>6} {:>8} {:>10} {:>14} {:>14}'.format(
+        'ids', 'encoding', 'url bytes', 'encode (us)', 'decode (us)'))
+    for id_count in (10, 100, 1000):
+        for encoding in URLEncoding:
+            url_args, values = build(encoding, id_count)
+            url = url_args._generate_url(values)  # pylint: disable=protected-access
+            number = 200
+            encode = timeit.timeit(
+                lambda: url_args._generate_url(values),  # pylint: disable=protected-access
+                number=number)
+            decode = timeit.timeit(
+                lambda: url_args.decode(parse_href(url)[1]), number=number)
+            print('{:>6} {:>8} {:>10} {:>14.1f} {:>14.1f}'.format(
+                id_count, encoding.name, len(url), encode / number * 1e6,
+                decode / number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,12 @@
 
 from .version import __version__
 
+from .compression import Compressor
 from .controller_base import ControllerBase, LinkInfo
-from .multipage_controller import MultiPageDashController
-from .url_arg_manager import URLArgs
-from .callbacks import Input, Output, State
+from .data_cache import DataCache
+from .lazy_controller import LazyController
+from .metrics import Metrics
+from .multipage_controller import MultiPageDashController, NavCallbackMode
+from .url_arg_manager import URLArgs, URLEncoding, ValueTypes
+from .cache import freeze
+from .callbacks import Input, Output, State, memoize, offload
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+""" Callback fan out analysis for a MultiPageDashController app
+
+    For each trigger, navigating to a page or changing a linked input, reports
+    how many callbacks fire and how many server round trips the chain takes,
+    and flags callbacks that could be merged or moved to the browser.
+
+    Run from the app's directory with:
+    python -m dash_multipage.analysis multipage_app:PAGE_CTRL --max-callbacks 8
+"""
+
+from typing import Dict, FrozenSet, Iterator, List, NamedTuple, Set, Tuple
+import argparse
+import importlib
+import json
+import re
+import sys
+
+import plotly
+
+from dash_multipage.multipage_controller import (
+    MultiPageDashController, PAGE_CONTENT_ID, URL_ID, _callback_list,
+    _iter_components)
+from dash_multipage.url_arg_manager import URLEncoding
+
+Prop = Tuple[str, str]
+
+URL_PROPS = frozenset((URL_ID, prop)
+                      for prop in ('href', 'pathname', 'search', 'hash'))
+# Outputs that only change how a component looks
+PRESENTATION_PROPS = frozenset(('className', 'style', 'hidden'))
+
+
+class CallbackInfo(NamedTuple):
+    """ A registered callback's dependencies
+    """
+    name: str
+    outputs: FrozenSet[Prop]
+    inputs: FrozenSet[Prop]
+    state: FrozenSet[Prop]
+    clientside: bool
+    prevent_initial_call: bool
+
+
+class TriggerReport(NamedTuple):
+    """ The callbacks fired by one trigger
+
+        depth is the number of sequential server round trips, and callbacks
+        lists the names of the fired callbacks in the order they fire
+    """
+    trigger: str
+    server_callbacks: int
+    clientside_callbacks: int
+    depth: int
+    callbacks: List[str]
+
+
+class Finding(NamedTuple):
+    """ A possible improvement to some callbacks
+    """
+    kind: str
+    callbacks: List[str]
+    message: str
+
+
+class Report(NamedTuple):
+    """ Result of analyse
+    """
+    triggers: List[TriggerReport]
+    findings: List[Finding]
+
+
+def callback_graph(app) -> List[CallbackInfo]:
+    """ Return the dependencies of the callbacks registered with a dash app
+    """
+    return [CallbackInfo(
+        callback['output'],
+        frozenset((dep['id'], dep['property'])
+                  for dep in callback['outputs']),
+        frozenset((dep['id'], dep['property'])
+                  for dep in callback['inputs']),
+        frozenset((dep['id'], dep['property'])
+                  for dep in callback.get('state', [])),
+        bool(callback.get('clientside_function')),
+        bool(callback.get('prevent_initial_call')))
+            for callback in _callback_list(app)]
+
+
+def _simulate(callbacks: List[CallbackInfo], changed: Set[Prop],
+              present_ids: Set[str], page_ids: Set[str],
+              insert_ids: Set[str], unchanged: FrozenSet[str] = frozenset()
+              ) -> Iterator[List[CallbackInfo]]:
+    """ Yield the callbacks fired in each round after the changed props
+
+        Like the dash renderer, only callbacks with an output in the current
+        layout (present_ids) fire. When a callback updates the children of
+        one of insert_ids, the page's components (page_ids) are inserted and
+        their initial callbacks fire in the next round. The callbacks named in
+        unchanged fire without changing their outputs.
+    """
+    fired: Set[str] = set()
+    present = set(present_ids)
+    inserted = False
+    while changed:
+        fire = [callback for callback in callbacks
+                if callback.name not in fired and
+                any(dep[0] in present for dep in callback.outputs) and (
+                    callback.inputs & changed or
+                    (inserted and not callback.prevent_initial_call and
+                     any(dep[0] in page_ids for dep in callback.inputs)))]
+        if not fire:
+            return
+        yield fire
+        fired.update(callback.name for callback in fire)
+        changed = set().union(*(callback.outputs for callback in fire
+                                if callback.name not in unchanged))
+        inserted = any(output == (insert_id, 'children')
+                       for output in changed for insert_id in insert_ids)
+        if inserted:
+            present |= page_ids
+
+
+def _report(trigger: str, rounds: List[List[CallbackInfo]]) -> TriggerReport:
+    fired = [callback for fire in rounds for callback in fire]
+    return TriggerReport(
+        trigger,
+        sum(1 for callback in fired if not callback.clientside),
+        sum(1 for callback in fired if callback.clientside),
+        sum(1 for fire in rounds
+            if any(not callback.clientside for callback in fire)),
+        [callback.name for callback in fired])
+
+
+def _layout_ids(layout) -> Set[str]:
+    """ Return the component ids in a layout
+    """
+    return {component_id for component_id, _ in _iter_components(json.loads(
+        json.dumps(layout, cls=plotly.utils.PlotlyJSONEncoder)))}
+
+
+def _page_ids(page_ctrl: MultiPageDashController, ctrl) -> Set[str]:
+    """ Return the component ids in a page's layout
+    """
+    page_path = ctrl.get_link_info().page_path
+    args = {name: ['0'] for name in re.findall(r'<(\w+)>', page_path)}
+    with page_ctrl.app.server.test_request_context():
+        layout = page_ctrl.resolve(ctrl.layout(args))
+    return _layout_ids(layout)
+
+
+def _findings(page_ctrl: MultiPageDashController,
+              callbacks: List[CallbackInfo]) -> List[Finding]:
+    findings = []
+    groups: Dict[Tuple[FrozenSet[Prop], FrozenSet[Prop]],
+                 List[str]] = {}
+    for callback in callbacks:
+        if not callback.clientside:
+            groups.setdefault((callback.inputs, callback.state),
+                              []).append(callback.name)
+    for (inputs, _), names in groups.items():
+        if len(names) > 1:
+            findings.append(Finding(
+                'mergeable', names,
+                '{} server callbacks on {} could be one multi-output '
+                'callback'.format(len(names), ', '.join(sorted(
+                    '{}.{}'.format(*dep) for dep in inputs)))))
+    url_ids = {dep[0] for dep in URL_PROPS}
+    for callback in callbacks:
+        if (not callback.clientside and not callback.state and
+                {dep[0] for dep in callback.inputs} <= url_ids and
+                {dep[1] for dep in callback.outputs} <= PRESENTATION_PROPS):
+            findings.append(Finding(
+                'clientside', [callback.name],
+                'only restyles components from the URL, so could be a '
+                'clientside callback (see NavCallbackMode.CLIENTSIDE)'))
+    for ctrl in page_ctrl.ctrls:
+        url_args = getattr(ctrl, 'url_args', None)
+        if url_args is None or url_args.clientside:
+            continue
+        if url_args.state_store is None and url_args.encoding == URLEncoding.PLAIN:
+            findings.append(Finding(
+                'clientside', [url_args.link_id + '.value',
+                               url_args.link_id_workaround + '.children'],
+                'link box could be updated in the browser with '
+                'URLArgs(..., clientside=True), removing both server '
+                'callbacks'))
+    return findings
+
+
+def _in_place_callbacks(page_ctrl: MultiPageDashController,
+                        callbacks: List[CallbackInfo]) -> Set[str]:
+    """ Return the names of the callbacks updating pages in place on query
+        changes
+    """
+    deps: Set[Prop] = set()
+    for ctrl in page_ctrl.ctrls:
+        if ctrl.get_link_info().page_link_id in page_ctrl.in_place_ids:
+            deps.update((arg.info.component.id, arg.info.value_name)
+                        for arg in ctrl.url_args.schema)
+    return {callback.name for callback in callbacks
+            if callback.inputs == {(URL_ID, 'href')} and
+            callback.outputs <= deps}
+
+
+def analyse(page_ctrl: MultiPageDashController) -> Report:
+    """ Report the callbacks fired by navigating to each page, by leaving
+        each page updated in place on query changes, and by changing each
+        input that isn't set by a callback
+
+        Lazy pages are loaded so their callbacks are included.
+    """
+    page_ctrl.load_lazy_ctrls()
+    callbacks = callback_graph(page_ctrl.app)
+    insert_ids = {PAGE_CONTENT_ID} | {
+        page_ctrl._page_container_id(ctrl)  # pylint: disable=protected-access
+        for ctrl in page_ctrl.client_cached_ctrls}
+    # The URLArgs components are outputs of the in place update callbacks,
+    # but are still changed by the user
+    in_place = _in_place_callbacks(page_ctrl, callbacks)
+    outputs = set().union(*(callback.outputs for callback in callbacks
+                            if callback.name not in in_place))
+    top_ids = _layout_ids(page_ctrl.top_layout)
+    triggers = []
+    for ctrl in page_ctrl.ctrls:
+        page_ids = _page_ids(page_ctrl, ctrl)
+        page_path = ctrl.get_link_info().page_path
+        triggers.append(_report('navigate {}'.format(page_path), list(
+            _simulate(callbacks, set(URL_PROPS), top_ids, page_ids,
+                      insert_ids))))
+        if ctrl.get_link_info().page_link_id in page_ctrl.in_place_ids:
+            # The page's in place update callback also makes a request that
+            # changes nothing when the URL changes to another page. This
+            # counts it with the nav bar and router callbacks; the new page's
+            # initial callbacks are in its navigate trigger.
+            triggers.append(_report('leave {}'.format(page_path), list(
+                _simulate(callbacks, set(URL_PROPS), top_ids | page_ids,
+                          set(), set(), frozenset(in_place)))))
+        inputs = sorted({dep for callback in callbacks
+                         for dep in callback.inputs
+                         if dep[0] in page_ids and dep not in outputs})
+        for dep in inputs:
+            triggers.append(_report('{}.{}'.format(*dep), list(
+                _simulate(callbacks, {dep}, top_ids | page_ids, set(),
+                          set()))))
+    return Report(triggers, _findings(page_ctrl, callbacks))
+
+
+def main(argv: List[str] = None) -> int:
+    """ Print the analysis of the MultiPageDashController named by a
+        'module:name' argument, and return 1 if any trigger is over the limits
+    """
+    parser = argparse.ArgumentParser(
+        description='Report the callbacks fired by each page navigation and '
+                    'input change')
+    parser.add_argument('controller',
+                        help="the MultiPageDashController as 'module:name'")
+    parser.add_argument('--max-callbacks', type=int,
+                        help='fail if a trigger fires more server callbacks')
+    parser.add_argument('--max-depth', type=int,
+                        help='fail if a trigger takes more round trips')
+    parser.add_argument('--json', action='store_true',
+                        help='print the report as JSON')
+    args = parser.parse_args(argv)
+    module_name, _, attr = args.controller.partition(':')
+    sys.path.insert(0, '.')
+    page_ctrl = getattr(importlib.import_module(module_name), attr)
+    report = analyse(page_ctrl)
+
+    failures = [trigger for trigger in report.triggers if (
+        args.max_callbacks is not None and
+        trigger.server_callbacks > args.max_callbacks) or (
+            args.max_depth is not None and trigger.depth > args.max_depth)]
+    if args.json:
+        print(json.dumps({
+            'triggers': [trigger._asdict() for trigger in report.triggers],
+            'findings': [finding._asdict() for finding in report.findings],
+            'failures': [trigger.trigger for trigger in failures],
+        }, indent=2))
+    else:
+        print('{:<48} {:>7} {:>11} {:>6}'.format(
+            'trigger', 'server', 'clientside', 'depth'))
+        for trigger in report.triggers:
+            print('{:<48} {:>7} {:>11} {:>6}{}'.format(
+                trigger.trigger, trigger.server_callbacks,
+                trigger.clientside_callbacks, trigger.depth,
+                '  over limit' if trigger in failures else ''))
+        for finding in report.findings:
+            print('\n{}: {}\n    {}'.format(finding.kind, finding.message,
+                                             '\n    '.join(finding.callbacks)))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+""" Caching helpers shared by the page controllers
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import atexit
+import json
+import mmap
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib import parse
+import weakref
+
+from dash.development.base_component import Component
+import plotly
+
+
+class LRUCache:
+    """ Thread safe in memory cache with a size bound, optional TTL and least
+        recently used eviction
+
+        Parameters
+        ----------
+        maxsize : maximum number of entries to keep
+        ttl : seconds an entry stays valid, or None to never expire
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """ Return the value for key, or default if it's missing or expired
+        """
+        with self._lock:
+            try:
+                expires, value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires and expires < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """ Store value for key, evicting the least recently used entries if
+            the cache is full
+        """
+        expires = time.monotonic() + self.ttl if self.ttl else 0
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """ Remove all entries
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """ Return the hit, miss and eviction counters and current size
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+        }
+
+
+class SQLiteCache:
+    """ Cache of bytes values in a local SQLite database, so it can be shared
+        by multiple worker processes on the same host
+
+        Writes are buffered and flushed in batches, either when batch_size
+        entries are pending or flush_interval seconds after the first pending
+        write. Pending writes are visible to this process immediately, and to
+        other processes after the flush.
+
+        Parameters
+        ----------
+        path : database file path
+        ttl : seconds an entry stays valid, or None to never expire
+        batch_size : number of pending writes that triggers a flush
+        flush_interval : maximum seconds a write stays pending
+        table : name of the table, so several caches can share a file
+        max_rows : if given, the oldest entries over this many are removed
+            when pending writes are flushed
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None,
+                 batch_size: int = 64, flush_interval: float = 0.5,
+                 table: str = 'cache', max_rows: Optional[int] = None):
+        if not re.match(r'^[A-Za-z_][A-Za-z0-9_]*$', table):
+            raise ValueError('Invalid table name: {}'.format(table))
+        self.path = path
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.table = table
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._pending: Dict[str, Tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        atexit.register(self.flush)
+
+    def _check_fork(self) -> None:
+        """ Drop the state inherited from the parent process after a fork,
+            for example by gunicorn workers with --preload
+
+            The parent's timer thread doesn't exist in the child, and the
+            parent flushes its own pending writes.
+        """
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+            self._timer = None
+            self._pending = {}
+
+    def _connection(self) -> sqlite3.Connection:
+        """ Return this thread's connection to the database, opened on first
+            use in each thread and process since SQLite connections can't be
+            used across a fork
+        """
+        pid = os.getpid()
+        local = getattr(self._local, 'conn', None)
+        if local is None or local[0] != pid:
+            conn = sqlite3.connect(self.path, timeout=30,
+                                   isolation_level=None)
+            # WAL lets readers in other processes continue during writes
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS {} (key TEXT PRIMARY KEY, '
+                'value BLOB, expires REAL)'.format(self.table))
+            local = self._local.conn = (pid, conn)
+        return local[1]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """ Return the value for key, or default if it's missing or expired
+        """
+        self._check_fork()
+        now = time.time()
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is None:
+            pending = self._connection().execute(
+                'SELECT expires, value FROM {} WHERE key = ?'.format(
+                    self.table), (key,)).fetchone()
+        if pending is None or (pending[0] and pending[0] < now):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pending[1]
+
+    def put(self, key: str, value: bytes) -> None:
+        """ Queue value to be stored for key
+        """
+        self._check_fork()
+        expires = time.time() + self.ttl if self.ttl else 0
+        with self._lock:
+            self._pending[key] = (expires, value)
+            if len(self._pending) < self.batch_size:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.flush_interval,
+                                                  self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self) -> None:
+        """ Write the pending entries and remove expired ones, and the oldest
+            ones over max_rows
+        """
+        self._check_fork()
+        with self._lock:
+            batch = dict(self._pending)
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO {} (key, expires, value) '
+                'VALUES (?, ?, ?)'.format(self.table),
+                [(key, expires, value)
+                 for key, (expires, value) in batch.items()])
+            conn.execute(
+                'DELETE FROM {} WHERE expires > 0 AND expires < ?'.format(
+                    self.table), (time.time(),))
+            if self.max_rows is not None:
+                # Replaced entries get a new rowid, so the newest entries have
+                # the highest ones
+                conn.execute(
+                    'DELETE FROM {0} WHERE rowid <= '
+                    '(SELECT MAX(rowid) FROM {0}) - ?'.format(self.table),
+                    (self.max_rows,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        # Entries stay pending until written so they're always readable here
+        with self._lock:
+            for key, entry in batch.items():
+                if self._pending.get(key) is entry:
+                    del self._pending[key]
+
+    def stats(self) -> Dict[str, int]:
+        """ Return the hit and miss counters and number of pending writes
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'pending': len(self._pending),
+        }
+
+
+def args_key(route: str, args: Dict[str, List[str]]) -> Hashable:
+    """ Return a hashable key for a route and its parse_href args that does not
+        depend on the order of the arguments
+    """
+    return route, tuple(sorted((key, tuple(vals)) for key, vals in args.items()))
+
+
+# Index of the layouts exported by dash_multipage.prerender
+MANIFEST = 'manifest.json'
+
+
+def page_key(route: str, args: Dict[str, List[str]]) -> str:
+    """ Return a canonical URL for a route and its parse_href args, with the
+        arguments sorted
+    """
+    if not args:
+        return route
+    return '{}?{}'.format(route, parse.urlencode(sorted(
+        (key, val) for key, vals in args.items() for val in vals)))
+
+
+def load_prerendered(directory: str) -> Dict[str, mmap.mmap]:
+    """ Return the layouts exported to directory, memory mapped read only,
+        keyed by page_key
+    """
+    with open(os.path.join(directory, MANIFEST)) as manifest_file:
+        manifest = json.load(manifest_file)
+    layouts = {}
+    for key, page in manifest['pages'].items():
+        with open(os.path.join(directory, page['file']), 'rb') as page_file:
+            # The mapping stays valid after the file is closed
+            layouts[key] = mmap.mmap(page_file.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+    return layouts
+
+
+# Snapshot of each frozen object by id, with a weak reference to the object.
+# Entries are removed when the object is garbage collected.
+_FROZEN: Dict[int, Tuple[weakref.ref, Any]] = {}
+_FROZEN_LOCK = threading.Lock()
+
+
+class _FrozenList(list):
+    """ list that can be weakly referenced """
+
+
+class _FrozenDict(dict):
+    """ dict that can be weakly referenced """
+
+
+def freeze(obj: Any) -> Any:
+    """ Mark a component tree, or a prop value like a list of dropdown
+        options, as never changing and return it
+
+        snapshot_layout reuses one snapshot of a frozen object everywhere it
+        appears, so cached layouts share it instead of each holding a copy.
+        The object must not be modified afterwards. Lists, tuples and dicts
+        are copied, so use the returned object.
+
+        Freeze objects built once, like in the controller's constructor.
+        Objects frozen in layout() are new on every call, so nothing shares
+        them. The registry only holds a weak reference to each object.
+    """
+    if isinstance(obj, (list, tuple)):
+        obj = _FrozenList(obj)
+    elif isinstance(obj, dict):
+        obj = _FrozenDict(obj)
+    elif not isinstance(obj, Component):
+        # Nothing to share for other values
+        return obj
+    snapshot = snapshot_layout(obj)
+    key = id(obj)
+
+    def _forget(ref: weakref.ref) -> None:
+        # Runs during garbage collection, possibly with _FROZEN_LOCK held by
+        # this thread, so doesn't take it
+        entry = _FROZEN.get(key)
+        if entry is not None and entry[0] is ref:
+            _FROZEN.pop(key, None)
+
+    with _FROZEN_LOCK:
+        _FROZEN[key] = (weakref.ref(obj, _forget), snapshot)
+    return obj
+
+
+def frozen_objects() -> List[Tuple[Any, Any]]:
+    """ Return each frozen object that is still alive with its shared
+        snapshot
+    """
+    with _FROZEN_LOCK:
+        entries = list(_FROZEN.values())
+    return [(obj, snapshot) for obj, snapshot in
+            ((ref(), snapshot) for ref, snapshot in entries)
+            if obj is not None]
+
+
+class _ContainsFrozen(Exception):
+    pass
+
+
+class _FrozenCheckEncoder(plotly.utils.PlotlyJSONEncoder):
+    """ Encoder that stops at the first component that is frozen or has a
+        frozen prop value
+    """
+
+    def default(self, obj):  # pylint: disable=arguments-differ,method-hidden
+        if isinstance(obj, Component) and (
+                id(obj) in _FROZEN or
+                any(id(value) in _FROZEN for value in vars(obj).values())):
+            raise _ContainsFrozen()
+        return super().default(obj)
+
+
+def snapshot_layout(layout: Any) -> Any:
+    """ Convert a component tree into the plain JSON structure Dash sends to
+        the browser. Unlike the components, the result doesn't change if the
+        components are modified later.
+
+        Frozen components and frozen prop values of components are shared
+        with other snapshots instead of copied.
+    """
+    if not _FROZEN:
+        return json.loads(json.dumps(layout,
+                                     cls=plotly.utils.PlotlyJSONEncoder))
+    if id(layout) not in _FROZEN:
+        # Trees without frozen objects don't need the slower walk
+        try:
+            return json.loads(json.dumps(layout, cls=_FrozenCheckEncoder))
+        except _ContainsFrozen:
+            pass
+    return _snapshot(layout)
+
+
+def _snapshot(value: Any) -> Any:
+    """ snapshot_layout walking the tree to reuse the frozen snapshots
+    """
+    frozen = _FROZEN.get(id(value))
+    if frozen is not None and frozen[0]() is value:
+        return frozen[1]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_snapshot(item) for item in value]
+    if isinstance(value, Component):
+        value = value.to_plotly_json()
+    if isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        return {key: _snapshot(item) for key, item in value.items()}
+    return json.loads(json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder))
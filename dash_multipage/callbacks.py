@@ -1,9 +1,32 @@
 """ Convenience wrappers to allow Components to be directly used to initialize
     dependencies. This avoids linting issues if "id" is seen as an attribute
+
+    Also includes memoize, a decorator for caching callback results, and
+    offload, for running callbacks in a process pool.
 """
 
+from concurrent import futures
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+import functools
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+
 from dash import dependencies
 from dash.development.base_component import Component
+import dash_html_components as html
+import flask
+
+from dash_multipage.cache import LRUCache, SQLiteCache
+
+_MISSING = object()
+
+LOGGER = logging.getLogger(os.path.basename(__file__))
+
 
 # pylint: disable=too-few-public-methods
 class Output(dependencies.Output):
@@ -27,3 +50,181 @@ class State(dependencies.State):
 
     def __init__(self, component: Component, component_property='value'):
         super().__init__(component.id, component_property)
+
+
+class _InFlight:
+    """ A computation other threads with the same arguments wait for """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+def _code_digest(code: Any) -> str:
+    """ Return a hash of a code object's bytecode, constants and names that
+        is the same in every process, so shared cache entries of a changed
+        function aren't used
+    """
+    digest = hashlib.sha256()
+    stack = [code]
+    while stack:
+        code = stack.pop()
+        digest.update(code.co_code)
+        digest.update(repr(code.co_names).encode('utf-8'))
+        for const in code.co_consts:
+            if hasattr(const, 'co_code'):
+                stack.append(const)
+            else:
+                digest.update(repr(const).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def memoize(maxsize=128, ttl: Optional[float] = None,
+            shared_path: Optional[str] = None,
+            namespace: Optional[str] = None) -> Callable:
+    """ Decorator caching a callback's result by its argument values
+
+        Only use this for callbacks whose result depends only on their Input
+        and State values. Concurrent calls with the same arguments wait for a
+        single computation. Not for async def callbacks, since it would
+        cache the coroutine. Should be placed below app.callback:
+
+            @app.callback(Output(...), [Input(...)])
+            @memoize(ttl=60)
+            def _update(value):
+                ...
+
+        Parameters
+        ----------
+        maxsize : maximum number of results kept in memory
+        ttl : seconds a result stays valid, or None to never expire
+        shared_path : if given, results are pickled to a SQLite database at
+            this path instead, so they're shared by the worker processes on
+            the host. Results must be picklable.
+        namespace : included in the shared cache keys with the function's
+            name and a hash of its code. Give each a distinct namespace when
+            several controllers register the same nested function, so they
+            don't read each other's results.
+    """
+    def decorator(func: Callable) -> Callable:
+        name = '{}.{}'.format(func.__module__, func.__qualname__)
+        code = getattr(func, '__code__', None)
+        key_prefix = [name, namespace,
+                      _code_digest(code) if code is not None else None]
+        if shared_path is None:
+            cache: Any = LRUCache(maxsize, ttl)
+        else:
+            cache = SQLiteCache(shared_path, ttl, table='callback_cache')
+        in_flight: Dict[str, _InFlight] = {}
+        lock = threading.Lock()
+        stats = {'coalesced': 0}
+
+        def load(key: str) -> Any:
+            value = cache.get(key, _MISSING)
+            if shared_path is not None and value is not _MISSING:
+                value = pickle.loads(value)
+            return value
+
+        def store(key: str, value: Any) -> None:
+            if shared_path is not None:
+                value = pickle.dumps(value)
+            cache.put(key, value)
+
+        @functools.wraps(func)
+        def _memoized(*args, **kwargs):
+            key = hashlib.sha256(json.dumps(
+                [key_prefix, args, kwargs], sort_keys=True, default=repr
+            ).encode('utf-8')).hexdigest()
+            value = load(key)
+            if value is not _MISSING:
+                return value
+            with lock:
+                call = in_flight.get(key)
+                leader = call is None
+                if leader:
+                    call = in_flight[key] = _InFlight()
+                else:
+                    stats['coalesced'] += 1
+            if not leader:
+                call.done.wait()
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            try:
+                call.result = func(*args, **kwargs)
+                store(key, call.result)
+                return call.result
+            except BaseException as err:
+                call.error = err
+                raise
+            finally:
+                with lock:
+                    del in_flight[key]
+                call.done.set()
+
+        def cache_stats() -> Dict[str, int]:
+            """ Return the cache counters and number of coalesced calls
+            """
+            result = dict(cache.stats())
+            result['coalesced'] = stats['coalesced']
+            return result
+
+        _memoized.cache_stats = cache_stats  # type: ignore
+        _memoized.cache_name = (  # type: ignore
+            name if namespace is None else '{}[{}]'.format(name, namespace))
+        return _memoized
+    return decorator
+
+
+def offload(func: Callable, timeout: Optional[float] = None,
+            timeout_result: Any = _MISSING) -> Callable:
+    """ Wrap a CPU bound function to run in MultiPageDashController's process
+        pool when used as a callback
+
+            app.callback(Output(...), [Input(...)])(offload(build_figure, 10))
+
+        func must be defined at the top level of a module so it can be sent to
+        the worker processes, and its arguments and result must be picklable.
+        If the controller has no process pool, func runs in the calling thread.
+
+        A call that times out while running can't be cancelled, so the worker
+        process running it is terminated and replaced. A call whose worker
+        died is retried once.
+
+        Parameters
+        ----------
+        func : the function to run
+        timeout : seconds to wait for the result, or None to wait forever
+        timeout_result : returned if the timeout expires. Defaults to a Div
+            with an error message.
+    """
+    if timeout_result is _MISSING:
+        timeout_result = html.Div('This took too long to load, try again later.',
+                                  className='alert alert-warning')
+
+    @functools.wraps(func)
+    def _offloaded(*args):
+        page_ctrl = flask.current_app.extensions.get('dash_multipage')
+        if page_ctrl is None or not page_ctrl.process_pool_size:
+            return func(*args)
+        for attempt in range(2):
+            future = page_ctrl.submit(func, *args)
+            try:
+                return future.result(timeout)
+            except futures.TimeoutError:
+                if not future.cancel():
+                    # Free the worker still running it
+                    page_ctrl.terminate_job(future)
+                LOGGER.warning('%s timed out after %s s', func.__qualname__,
+                               timeout)
+                return timeout_result
+            except BrokenProcessPool:
+                # The worker died while this ran
+                if attempt:
+                    raise
+                LOGGER.warning('Retrying %s in a new process pool',
+                               func.__qualname__)
+        return None
+    return _offloaded
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+""" Compression of layout and callback responses
+
+    MultiPageDashController compresses its responses when given a Compressor.
+    Brotli is used when the brotli package is installed and the browser
+    accepts it, otherwise gzip. Responses already compressed, for example by
+    dash's own Flask-Compress support, are left alone.
+"""
+
+from typing import Dict, List, Optional
+import gzip
+import hashlib
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from dash_multipage.cache import LRUCache
+
+# CPU time of the calling thread, so other request threads aren't counted.
+# time.thread_time needs Python 3.7.
+_thread_time = getattr(time, 'thread_time', time.process_time)
+
+
+class Compressor:
+    """ Compresses response bodies, caching the results by body digest
+
+        Identical bodies, like cached layouts, are compressed once.
+
+        Parameters
+        ----------
+        min_size : bodies smaller than this many bytes are sent uncompressed
+        gzip_level : gzip compression level
+        brotli_quality : brotli compression quality
+        cache_size : number of compressed bodies kept
+    """
+
+    def __init__(self, min_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 4, cache_size: int = 256):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = LRUCache(cache_size)
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def encodings(self) -> List[str]:
+        """ Supported content encodings in order of preference
+        """
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        """ Return data compressed with the encoding, from the cache if the
+            same data was compressed before
+        """
+        key = (hashlib.sha1(data).digest(), encoding)
+        compressed = self.cache.get(key)
+        if compressed is None:
+            start = _thread_time()
+            if encoding == 'br':
+                compressed = brotli.compress(data, quality=self.brotli_quality)
+            else:
+                compressed = gzip.compress(data, self.gzip_level)
+            with self._lock:
+                self.cpu_seconds += _thread_time() - start
+            self.cache.put(key, compressed)
+        self.record(len(data), len(compressed))
+        return compressed
+
+    def record(self, size_in: int, size_out: int) -> None:
+        """ Count a response compressed from size_in to size_out bytes
+        """
+        with self._lock:
+            self.responses += 1
+            self.bytes_in += size_in
+            self.bytes_out += size_out
+
+    def choose(self, accept_encodings) -> Optional[str]:
+        """ Return the preferred encoding in a request's werkzeug
+            accept_encodings, or None if it accepts none of them
+        """
+        return accept_encodings.best_match(self.encodings)
+
+    def stats(self) -> Dict[str, float]:
+        """ Return the number of compressed responses, their total size before
+            and after, the CPU seconds spent compressing and the cache hits
+        """
+        return {
+            'responses': self.responses,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'ratio': self.bytes_in / self.bytes_out if self.bytes_out else 0.0,
+            'cpu_seconds': self.cpu_seconds,
+            'cache_hits': self.cache.hits,
+        }
+
@@ -3,22 +3,28 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import NamedTuple, Dict
+from typing import Any, Callable, NamedTuple, Dict, Optional
 
+from dash_core_components import Store
 from dash_html_components import Div
 
+from dash_multipage.data_cache import DataCache
+
 
 class LinkInfo(NamedTuple):
     """ The link info for a controller
 
         Attributes:
             link_text: Text to show in navigation tab
-            page_path: The url path for the page starting with '/'
+            page_path: The url path for the page starting with '/'. Segments
+                of the form <name> match any value, which is passed to
+                layout() as args[name]
             page_link_id: unique id for the navigation link callback
 
         for example:
             ('Metrics Viewer', '/metrics', 'metrics_view')
             ('Run Viewer', '/', 'run_view')
+            ('Run Details', '/runs/<run_id>', 'run_details')
     """
     link_text: str
     page_path: str
@@ -27,12 +33,101 @@ class LinkInfo(NamedTuple):
 
 class ControllerBase(ABC):
     """ Abstract base class for controllers for a page in a multipage dash app
+
+        Attributes:
+            cacheable: if True, layouts are cached by route and args. Only set
+                this if layout() gives the same result for the same args.
+                Layouts of pages with deferred regions aren't cached.
+            cache_ttl: seconds a cached layout stays valid, None for no limit
+            cache_size: maximum number of cached layouts for this page
+            client_cacheable: if False, this page is never kept mounted by
+                MultiPageDashController's client side page cache. Set it on
+                the LazyController for lazily loaded pages.
+            data_cache: the DataCache shared by all pages, set by
+                MultiPageDashController. Register loaders on it and use
+                data_cache.get in layout() and callbacks instead of loading
+                data per request.
+            update_in_place: if True and the controller has a url_args
+                URLArgs attribute, a URL change that only changes the query
+                arguments updates the URLArgs components whose values changed
+                instead of rendering the page again. Only set it if layout()
+                uses no query arguments other than those registered with
+                url_args. Requires dash 1.12 or newer. Set it on the
+                LazyController for lazily loaded pages.
     """
+    cacheable = False
+    cache_ttl: Optional[float] = None
+    cache_size = 128
+    client_cacheable = True
+    data_cache: Optional[DataCache] = None
+    update_in_place = False
 
     @abstractmethod
     def layout(self, args: Dict) -> Div:
         """ Return this controller's layout initialized with a of optional args
+
+            args maps each query argument and path parameter to a list of
+            string values. Path parameters take precedence over query
+            arguments with the same name.
+
+            This can be an async def, which MultiPageDashController runs on
+            its shared event loop, so the layout can gather slow fetches
+            concurrently. Callbacks registered with app.callback and deferred
+            region functions can also be async. The request thread still
+            waits for the result, so this reduces the latency of a request
+            but not the number of server threads needed.
+        """
+
+    def deferred_regions(self) -> Dict[str, Callable[[Dict], Any]]:
+        """ Return the functions building the slow sections of the page keyed
+            by region name
+
+            Each function takes the layout args and returns the region's
+            children. layout() should include deferred_region(name, args) for
+            each region. The page is shown with placeholders first, and the
+            regions are computed in parallel and filled in by callbacks
+            registered by MultiPageDashController. The args passed to layout()
+            then include a '_render' key identifying the render, which isn't
+            passed to the region functions.
+
+            The regions are started by the process that rendered the page and
+            collected by the region callbacks. When the app is served by
+            several worker processes the callback may be handled by another
+            worker, which computes the region again itself, so a region's
+            function can run twice for one page load.
+        """
+        return {}
+
+    def deferred_region_id(self, name: str) -> str:
+        """ Return the id of the Div a deferred region is shown in
+        """
+        return '{}/deferred-{}'.format(self.get_link_info().page_link_id, name)
+
+    def deferred_region(self, name: str, args: Dict,
+                        placeholder: Any = 'Loading...') -> Div:
+        """ Return the placeholder for a deferred region to include in layout()
+
+            Parameters
+            ----------
+            name : key of the region in deferred_regions()
+            args : the args passed to layout()
+            placeholder : shown until the region is computed
+        """
+        region_id = self.deferred_region_id(name)
+        return Div([
+            Div(id=region_id, children=placeholder),
+            Store(id=region_id + '-args', data=args),
+        ])
+
+    def skeleton(self) -> Div:
+        """ Return a layout containing every component used by this
+            controller's callbacks, used once by dash to validate them
+
+            This should not load data or change any state. The default uses
+            layout({}), so override it if layout() is expensive or has side
+            effects.
         """
+        return self.layout({})
 
     @abstractmethod
     def register_callbacks(self, app) -> None:
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+""" Shared cache for the data pages load
+
+    Loaders are registered by name, and their results are cached by the
+    arguments they were called with. Entries expire after their TTL, are
+    refreshed in the background shortly before they do, and the least recently
+    used are evicted when the total measured size goes over the memory budget.
+"""
+
+from collections import OrderedDict
+from concurrent import futures
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+
+
+class LoaderInfo(NamedTuple):
+    """ A registered data loader
+    """
+    loader: Callable[..., Any]
+    ttl: Optional[float]
+    refresh_ahead: float
+    shared: bool
+
+
+class _Entry:
+    """ A cached loader result """
+    # pylint: disable=too-few-public-methods
+    __slots__ = ('value', 'size', 'expires', 'refreshing')
+
+    def __init__(self, value: Any, size: int, expires: float):
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.refreshing = False
+
+
+def measure_size(obj: Any) -> int:
+    """ Estimate the bytes of memory used by an object and what it contains
+
+        numpy arrays and pandas objects report their own size, other objects
+        are measured with sys.getsizeof, recursing into containers.
+    """
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        memory_usage = getattr(item, 'memory_usage', None)
+        if callable(memory_usage) and hasattr(item, 'index'):
+            # pandas DataFrame or Series
+            usage = memory_usage(deep=True)
+            total += int(getattr(usage, 'sum', lambda: usage)())
+            continue
+        nbytes = getattr(item, 'nbytes', None)
+        if isinstance(nbytes, int):
+            # numpy array. Memory mapped arrays don't use process memory.
+            if getattr(item, 'filename', None) is None:
+                total += nbytes
+            continue
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return total
+
+
+class DataCache:
+    """ Cache of named data loaders' results with a memory budget
+
+        Parameters
+        ----------
+        memory_budget : maximum total measured bytes of cached results
+        refresh_workers : threads used to refresh entries before they expire,
+            started on first use
+        mmap_dir : directory for the results of loaders registered with
+            shared=True. These must be numpy arrays, and are stored as .npy
+            files and read back memory mapped, so the worker processes on a
+            host share one copy.
+    """
+
+    def __init__(self, memory_budget: int = 256 * 1024 * 1024,
+                 refresh_workers: int = 2, mmap_dir: Optional[str] = None):
+        self.memory_budget = memory_budget
+        self.refresh_workers = refresh_workers
+        self.mmap_dir = mmap_dir
+        self.loaders: Dict[str, LoaderInfo] = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.size = 0
+        self.logger = logging.getLogger(os.path.basename(__file__))
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._refresh_pool: Optional[futures.ThreadPoolExecutor] = None
+        # Threads don't survive a fork, see _check_fork
+        self._pid = os.getpid()
+
+    def register(self, name: str, loader: Callable[..., Any],
+                 ttl: Optional[float] = None, refresh_ahead: float = 0.0,
+                 shared=False) -> None:
+        """ Register a loader
+
+        Parameters
+        ----------
+        name : name used to get the loader's data
+        loader : function loading the data. Its arguments are used in the
+            cache key so must be hashable.
+        ttl : seconds a result stays valid, or None to never expire
+        refresh_ahead : seconds before expiry when a get starts a background
+            refresh and keeps returning the current value until it's done
+        shared : store the result memory mapped in mmap_dir
+        """
+        if shared and self.mmap_dir is None:
+            raise ValueError('shared loaders need a DataCache mmap_dir')
+        self.loaders[name] = LoaderInfo(loader, ttl, refresh_ahead, shared)
+
+    def get(self, name: str, *args) -> Any:
+        """ Return the named loader's data for the arguments, loading it if it
+            isn't cached or has expired
+        """
+        key = (name, args)
+        info = self.loaders[name]
+        self._check_fork()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (not entry.expires or entry.expires > now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if (entry.expires and not entry.refreshing and
+                        entry.expires - info.refresh_ahead <= now):
+                    entry.refreshing = self._start_refresh(key, info)
+                return entry.value
+            self.misses += 1
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # Only one thread loads a key, the others wait and use its result
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and (not entry.expires or
+                                          entry.expires > time.monotonic()):
+                    return entry.value
+            return self._load(key, info)
+
+    def _check_fork(self) -> None:
+        """ Forget the refresh threads started by the parent process if this
+            is a forked child, like a gunicorn --preload worker
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        self._pid = pid
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._refresh_pool = None
+        # Refreshes running in the parent don't finish here
+        for entry in self._entries.values():
+            entry.refreshing = False
+
+    def _start_refresh(self, key: Tuple[str, Tuple], info: LoaderInfo) -> bool:
+        """ Start refreshing the entry in the background, starting the refresh
+            threads if needed. Called with _lock held. Returns False if the
+            refresh couldn't be started, as during interpreter shutdown.
+        """
+        if self._refresh_pool is None:
+            self._refresh_pool = futures.ThreadPoolExecutor(
+                self.refresh_workers,
+                thread_name_prefix='dash-multipage-refresh')
+        try:
+            self._refresh_pool.submit(self._refresh, key, info)
+        except RuntimeError:
+            # The entry is loaded again when it expires instead
+            return False
+        return True
+
+    def _refresh(self, key: Tuple[str, Tuple], info: LoaderInfo) -> None:
+        try:
+            self._load(key, info)
+            with self._lock:
+                self.refreshes += 1
+        except Exception:  # pylint: disable=broad-except
+            self.logger.exception('Failed to refresh %s', key[0])
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+
+    def _load(self, key: Tuple[str, Tuple], info: LoaderInfo) -> Any:
+        """ Run the loader and cache the result
+        """
+        name, args = key
+        if info.shared:
+            value = self._load_shared(name, args, info)
+        else:
+            value = info.loader(*args)
+        size = measure_size(value)
+        expires = time.monotonic() + info.ttl if info.ttl else 0
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old.size
+            if size > self.memory_budget:
+                self.logger.warning('%s result of %d bytes is over the '
+                                    'memory budget, not caching', name, size)
+                self._key_locks.pop(key, None)
+                return value
+            self._entries[key] = _Entry(value, size, expires)
+            self.size += size
+            while self.size > self.memory_budget:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+                self._key_locks.pop(evicted_key, None)
+                self.evictions += 1
+        return value
+
+    def _load_shared(self, name: str, args: Tuple, info: LoaderInfo) -> Any:
+        """ Return the loader's numpy array memory mapped from mmap_dir,
+            running the loader first if no other process has stored a fresh
+            copy
+        """
+        import numpy  # pylint: disable=import-outside-toplevel
+        digest = hashlib.sha1(repr(args).encode('utf-8')).hexdigest()[:16]
+        path = os.path.join(self.mmap_dir, '{}-{}.npy'.format(name, digest))
+        try:
+            fresh = (not info.ttl or
+                     os.path.getmtime(path) + info.ttl > time.time())
+        except OSError:
+            fresh = False
+        if not fresh:
+            value = numpy.asarray(info.loader(*args))
+            tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+            with open(tmp_path, 'wb') as tmp_file:
+                numpy.save(tmp_file, value)
+            # Readers never see a partly written file
+            os.replace(tmp_path, path)
+        return numpy.load(path, mmap_mode='r')
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """ Remove the cached results of a loader, or of all loaders
+        """
+        with self._lock:
+            for key in [key for key in self._entries
+                        if name is None or key[0] == name]:
+                self.size -= self._entries.pop(key).size
+
+    def stats(self) -> Dict[str, int]:
+        """ Return the hit, miss, refresh and eviction counters and the
+            number and total measured size of the cached results
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'size': self.size,
+        }
+
+    def shutdown(self, wait=True) -> None:
+        """ Stop the background refresh threads. They're started again if an
+            entry is later refreshed.
+        """
+        with self._lock:
+            pool = self._refresh_pool
+            self._refresh_pool = None
+        if pool is not None:
+            pool.shutdown(wait=wait)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+""" Controller proxy that defers importing and creating a page controller
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Union
+import importlib
+import logging
+import os
+import threading
+import time
+
+from dash_html_components import Div
+
+from dash_multipage.controller_base import ControllerBase, LinkInfo
+
+
+class LazyController(ControllerBase):
+    """ Stands in for a controller until it is first needed
+
+        The nav bar and route table only need the LinkInfo, so the controller's
+        module is imported and the controller created the first time its page
+        is requested, or earlier by MultiPageDashController's warm up thread.
+
+        Parameters
+        ----------
+        link_info : the LinkInfo the controller will return
+        factory : the controller class or a function returning the controller,
+            or a 'package.module:name' string naming one
+        *args, **kwargs : passed to factory
+    """
+
+    def __init__(self, link_info: LinkInfo,
+                 factory: Union[str, Callable[..., ControllerBase]],
+                 *args, **kwargs):
+        self.link_info = link_info
+        self.factory = factory
+        self.args = args
+        self.kwargs = kwargs
+        self.load_time: Optional[float] = None
+        self.logger = logging.getLogger(os.path.basename(__file__))
+        self._controller: Optional[ControllerBase] = None
+        self._app = None
+        self._on_load: List[Callable[[ControllerBase], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """ True once the controller has been created
+        """
+        return self._controller is not None
+
+    @property
+    def controller(self) -> ControllerBase:
+        """ The controller, which is created if it hasn't been already
+        """
+        if self._controller is None:
+            self.load()
+        return self._controller
+
+    def load(self) -> None:
+        """ Import and create the controller, and register its callbacks if
+            register_callbacks was already called
+        """
+        with self._lock:
+            if self._controller is not None:
+                return
+            start = time.perf_counter()
+            factory = self.factory
+            if isinstance(factory, str):
+                module_name, _, attr = factory.partition(':')
+                factory = getattr(importlib.import_module(module_name), attr)
+            controller = factory(*self.args, **self.kwargs)
+            self._controller = controller
+            if self._app is not None:
+                controller.register_callbacks(self._app)
+            for callback in self._on_load:
+                callback(controller)
+            self.load_time = time.perf_counter() - start
+            self.logger.info('Loaded %s in %.3f s',
+                             self.link_info.page_link_id, self.load_time)
+
+    def on_load(self, callback: Callable[[ControllerBase], None]) -> None:
+        """ Call callback with the controller once it's loaded, or now if it
+            already is
+        """
+        with self._lock:
+            controller = self._controller
+            if controller is None:
+                self._on_load.append(callback)
+        if controller is not None:
+            callback(controller)
+
+    # Caching options come from the controller, so reading them loads it
+    @property
+    def cacheable(self):  # type: ignore
+        return self.controller.cacheable
+
+    @property
+    def cache_ttl(self):  # type: ignore
+        return self.controller.cache_ttl
+
+    @property
+    def cache_size(self):  # type: ignore
+        return self.controller.cache_size
+
+    def layout(self, args: Dict) -> Div:
+        return self.controller.layout(args)
+
+    def deferred_regions(self) -> Dict[str, Callable[[Dict], Any]]:
+        return self.controller.deferred_regions()
+
+    def skeleton(self) -> Div:
+        """ Return the controller's skeleton, or an empty Div if it isn't
+            loaded yet so validation doesn't force it to load
+        """
+        if self._controller is None:
+            return Div()
+        return self._controller.skeleton()
+
+    def register_callbacks(self, app) -> None:
+        """ Register the controller's callbacks now if it is loaded, otherwise
+            when it is
+        """
+        with self._lock:
+            self._app = app
+            controller = self._controller
+        if controller is not None:
+            controller.register_callbacks(app)
+
+    def get_link_info(self) -> LinkInfo:  # type: ignore # pylint: disable=arguments-differ
+        return self.link_info
+
+    def __getattr__(self, name: str) -> Any:
+        # Forward anything else, like url_args, to the controller
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.controller, name)
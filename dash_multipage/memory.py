@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+""" Estimates of the memory retained by controllers and their layouts
+"""
+
+from typing import Any, Optional, Set
+import sys
+
+from dash.development.base_component import Component
+
+from dash_multipage.cache import LRUCache
+from dash_multipage.controller_base import ControllerBase
+from dash_multipage.url_arg_manager import URLArgs
+
+# Controller attributes that aren't part of the page, or are shared by every
+# page and reported elsewhere
+SKIP_ATTRS = frozenset(('data_cache', 'logger', '_app', '_lock', '_on_load',
+                        'factory'))
+
+
+def retained_size(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """ Estimate the bytes used by obj and the data it references
+
+        Follows containers, components, controllers, URLArgs and LRUCaches.
+        Functions, classes and modules aren't counted. Objects whose id is in
+        seen are skipped, and the ids of the counted objects are added to it,
+        so passing the same set to several calls counts shared objects once.
+    """
+    if seen is None:
+        seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or callable(item) and not isinstance(
+                item, (Component, ControllerBase)):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif isinstance(item, LRUCache):
+            stack.append(item._entries)  # pylint: disable=protected-access
+        elif isinstance(item, (Component, ControllerBase, URLArgs)):
+            attrs = vars(item)
+            seen.add(id(attrs))
+            total += sys.getsizeof(attrs)
+            stack.extend(value for name, value in attrs.items()
+                         if name not in SKIP_ATTRS)
+    return total
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+""" Timing and size metrics for a multipage dash app
+
+    MultiPageDashController records these when given a Metrics instance, and
+    serves them in the Prometheus text format.
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from typing import (Any, Callable, ContextManager, Deque, Dict, Iterator,
+                    List, Tuple)
+import functools
+import threading
+import time
+
+from dash.exceptions import PreventUpdate
+
+PREFIX = 'dash_multipage_'
+
+# name: (label name, help text). Metrics without a label use ''
+METRICS: Dict[str, Tuple[str, str]] = {
+    'parse_href_seconds': ('', 'Time to parse the page URL'),
+    'dispatch_seconds': ('', 'Time to find the controller for a URL'),
+    'layout_seconds': ('route', 'Time to build a page layout'),
+    'response_bytes': ('route', 'Size of serialised callback responses'),
+    'callback_seconds': ('callback', 'Time to run a callback'),
+}
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+
+class _NullContext:
+    """ Reusable context manager that does nothing, like
+        contextlib.nullcontext which needs Python 3.7
+    """
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+def no_timer(name: str, label: str = '') -> ContextManager:  # pylint: disable=unused-argument
+    """ Stand in for Metrics.time when metrics are disabled
+    """
+    return _NULL_CONTEXT
+
+
+class Histogram:
+    """ Count, sum and error count of observed values, with quantiles
+        estimated from a reservoir of the most recent values
+    """
+
+    def __init__(self, reservoir_size: int):
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.samples: Deque[float] = deque(maxlen=reservoir_size)
+
+    def observe(self, value: float, error=False) -> None:
+        """ Record a value
+        """
+        self.count += 1
+        self.total += value
+        if error:
+            self.errors += 1
+        self.samples.append(value)
+
+    def quantile(self, quantile: float) -> float:
+        """ Return the quantile of the recent values, or 0 if there are none
+        """
+        samples = sorted(self.samples)
+        if not samples:
+            return 0.0
+        return samples[int(quantile * (len(samples) - 1))]
+
+
+class Metrics:
+    """ Collection of the histograms in METRICS
+
+        Parameters
+        ----------
+        reservoir_size : number of recent values kept per histogram for the
+            quantiles
+    """
+
+    def __init__(self, reservoir_size: int = 1024):
+        self.reservoir_size = reservoir_size
+        self._histograms: Dict[str, Dict[str, Histogram]] = {
+            name: {} for name in METRICS}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, label: str, value: float,
+                error=False) -> None:
+        """ Record a value for the metric name and label value
+        """
+        with self._lock:
+            histograms = self._histograms[name]
+            histogram = histograms.get(label)
+            if histogram is None:
+                histogram = histograms[label] = Histogram(self.reservoir_size)
+            histogram.observe(value, error)
+
+    @contextmanager
+    def time(self, name: str, label: str = '') -> Iterator[None]:
+        """ Context manager recording the time taken by its body. Exceptions
+            are counted as errors, except PreventUpdate, which callbacks raise
+            to leave their outputs unchanged.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except PreventUpdate:
+            self.observe(name, label, time.perf_counter() - start)
+            raise
+        except BaseException:
+            self.observe(name, label, time.perf_counter() - start, True)
+            raise
+        self.observe(name, label, time.perf_counter() - start)
+
+    def wrap_callback(self, func: Callable, label: str) -> Callable:
+        """ Return func wrapped to record its time as callback_seconds
+        """
+        @functools.wraps(func)
+        def _timed_callback(*args, **kwargs) -> Any:
+            with self.time('callback_seconds', label):
+                return func(*args, **kwargs)
+        return _timed_callback
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """ Return count, sum, errors and quantiles for each metric and label
+        """
+        result: Dict[str, Dict[str, Dict[str, float]]] = {}
+        with self._lock:
+            for name, histograms in self._histograms.items():
+                result[name] = {}
+                for label, histogram in histograms.items():
+                    stats = {
+                        'count': histogram.count,
+                        'sum': histogram.total,
+                        'errors': histogram.errors,
+                    }
+                    for quantile in QUANTILES:
+                        stats['p{}'.format(int(quantile * 100))] = \
+                            histogram.quantile(quantile)
+                    result[name][label] = stats
+        return result
+
+    def prometheus(self) -> str:
+        """ Return the metrics in the Prometheus text exposition format
+        """
+        lines: List[str] = []
+        for name, labels in self.summary().items():
+            label_name, help_text = METRICS[name]
+            full_name = PREFIX + name
+            lines.append('# HELP {} {}'.format(full_name, help_text))
+            lines.append('# TYPE {} summary'.format(full_name))
+            errors = []
+            for label, stats in sorted(labels.items()):
+                label_str = ''
+                if label_name:
+                    label_str = '{}="{}"'.format(label_name, _escape(label))
+                for quantile in QUANTILES:
+                    lines.append('{}{{{}}} {}'.format(
+                        full_name,
+                        ','.join(filter(None, [label_str, 'quantile="{}"'.format(
+                            quantile)])),
+                        stats['p{}'.format(int(quantile * 100))]))
+                braces = '{{{}}}'.format(label_str) if label_str else ''
+                lines.append('{}_sum{} {}'.format(full_name, braces,
+                                                  stats['sum']))
+                lines.append('{}_count{} {}'.format(full_name, braces,
+                                                    stats['count']))
+                errors.append('{}_errors_total{} {}'.format(
+                    full_name, braces, stats['errors']))
+            if errors:
+                lines.append('# TYPE {}_errors_total counter'.format(full_name))
+                lines.extend(errors)
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(label: str) -> str:
+    return label.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -4,21 +4,134 @@
     This class turns a list of controllers into a multi-page website
 """
 
-from typing import List
+from collections import OrderedDict
+from concurrent import futures
+from typing import (Any, Callable, Dict, Hashable, Iterator, List, Optional,
+                    Set, Tuple, Union)
+from enum import Enum, auto
+import asyncio
+import atexit
+import functools
+import hashlib
+import inspect
+import json
 import logging
+import mmap
 import os
+import threading
+import uuid
+import weakref
 
 import dash_html_components as html
 import dash_core_components as dcc
 from dash import Dash
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
 import flask
+import plotly
 
+from dash_multipage.cache import (LRUCache, args_key, frozen_objects,
+                                  load_prerendered, page_key, snapshot_layout)
+from dash_multipage.compression import Compressor
 from dash_multipage.controller_base import ControllerBase
-from dash_multipage.url_arg_manager import parse_href
+from dash_multipage.data_cache import DataCache
+from dash_multipage.lazy_controller import LazyController
+from dash_multipage.memory import retained_size
+from dash_multipage.metrics import Metrics, no_timer
+from dash_multipage.process_pool import ProcessPool
+from dash_multipage.routing import RouteTable, is_pattern
+from dash_multipage.state_store import StateStore
+from dash_multipage.url_arg_manager import (TOKEN_KEY, URLArgs, parse_href,
+                                            resolve_state)
 
 URL_ID = 'url'
 
+# Maximum deferred regions started but not yet collected by their callback
+MAX_PENDING_DEFERRED = 256
+# Layout arg identifying a render of a page with deferred regions, so each
+# render's regions are collected by its own callbacks
+RENDER_KEY = '_render'
+
+PAGE_CONTENT_ID = 'page-content'
+# Client side page cache state, and the pages it asks the server to render
+PAGE_CACHE_ID = 'page-cache'
+PAGE_REQUEST_ID = 'page-request'
+# Route of the rendered page, to detect URL changes that only change the query.
+# Only added when a page is updated in place.
+PAGE_ROUTE_ID = 'page-route'
+
+NAV_LINK_CLASS = 'nav-link'
+NAV_LINK_ACTIVE_CLASS = 'nav-link active'
+
+# Clientside version of the nav-link update. %s is replaced with a JSON list
+# of the nav bar page paths.
+_CLIENTSIDE_NAV_UPDATE = '''
+function(pathname) {
+    var paths = %s;
+    return paths.map(function(path) {
+        return path === pathname ? '%s' : '%s';
+    });
+}
+'''
+
+
+# Clientside part of the client side page cache. Shows the page for the URL if
+# it's already mounted, otherwise asks the server to render it. The %s are
+# replaced with a JSON object mapping page paths to page_link_ids and the
+# maximum number of mounted pages.
+_CLIENTSIDE_PAGE_CACHE = '''
+function(href, cache) {
+    var pages = %s;
+    var maxPages = %s;
+    var noUpdate = window.dash_clientside.no_update;
+    var ids = Object.keys(pages).map(function(path) { return pages[path]; });
+    if (!href) {
+        return [noUpdate, noUpdate, noUpdate].concat(ids.map(function() {
+            return noUpdate;
+        }));
+    }
+    cache = cache || {mounted: {}, order: [], n: 0};
+    var path = new URL(href).pathname;
+    var active = pages.hasOwnProperty(path) ? pages[path] : null;
+    var request = noUpdate;
+    if (active === null) {
+        cache.n += 1;
+        request = {href: href, target: null, evict: [], n: cache.n};
+    } else {
+        cache.order = cache.order.filter(function(id) { return id !== active; });
+        cache.order.push(active);
+        if (cache.mounted[active] !== href) {
+            cache.mounted[active] = href;
+            var evict = [];
+            while (cache.order.length > maxPages) {
+                var evicted = cache.order.shift();
+                delete cache.mounted[evicted];
+                evict.push(evicted);
+            }
+            cache.n += 1;
+            request = {href: href, target: active, evict: evict, n: cache.n};
+        }
+    }
+    var styles = ids.map(function(id) {
+        return id === active ? {} : {display: 'none'};
+    });
+    return [cache, request, active === null ? {} : {display: 'none'}]
+        .concat(styles);
+}
+'''
+
+
+class NavCallbackMode(Enum):
+    """ How the nav bar tab highlighting is updated when the URL changes
+
+        PER_PAGE: a server callback for each nav-link
+        SINGLE: one server callback with an output for each nav-link
+        CLIENTSIDE: one clientside callback, so no server requests are made
+    """
+    PER_PAGE = auto()
+    SINGLE = auto()
+    CLIENTSIDE = auto()
+
+
 class MultiPageDashController():
     """ Class for generating a multipage dash app.
 
@@ -33,23 +146,154 @@ class MultiPageDashController():
                 the pages that make up this app.
             error_404 - rendering for 404 error page
             footer - common rendering to put at the bottom of all pages
+            nav_callback_mode - how the nav bar is updated, see NavCallbackMode.
+                SINGLE requires multi-output callback support and CLIENTSIDE
+                requires clientside callback support in the installed dash.
+            state_store - StateStore used to look up page state tokens from
+                URLArgs links. Must be the store the URLArgs save to.
+            warm_up - if True, LazyController pages are loaded by a
+                background thread at startup instead of on first use
+            metrics - if given, URL parsing, dispatch, layouts, response sizes
+                and every callback registered through app.callback are timed
+                and recorded in it
+            metrics_path - flask route serving the metrics in the Prometheus
+                text format
+            process_pool_size - number of worker processes for callbacks
+                wrapped with callbacks.offload. 0 runs them in the request
+                thread.
+            deferred_workers - number of threads computing the deferred
+                regions of pages (see ControllerBase.deferred_regions)
+            client_cache_size - if over 0, up to this many visited pages are
+                kept mounted but hidden in the browser, so switching back to
+                one doesn't need a server request. Pages with path parameters
+                or client_cacheable set to False are always rendered by the
+                server. Requires clientside callback support in dash.
+            data_cache - DataCache shared by the controllers, which get it as
+                their data_cache attribute. Pass one in to register loaders
+                before creating the controllers. A default DataCache is
+                created if not given.
+            warm_up_urls - URLs rendered at startup to fill the layout
+                caches. The callbacks fired when each page loads are also
+                run once with the page's initial values, filling memoized
+                callback caches. True uses the path of each page without path
+                parameters, which renders with its URLArgs defaults. Needs
+                warm_up to be True.
+            warm_up_workers - number of threads rendering warm_up_urls
+            health_path - flask route answering 503 until the startup warm up
+                is done and 200 after, for load balancer readiness checks.
+                None to not add the route.
+            compressor - if given, the layout and callback responses are
+                compressed with it when the browser accepts gzip or brotli
+            prerendered_dir - directory of layouts exported with
+                dash_multipage.prerender. URLs exported there are answered
+                from the memory mapped files instead of rendering the page.
+                Requires dash 1.11 or newer.
+            async_timeout - seconds an async layout or callback may run
+                before the request fails with a TimeoutError. None waits
+                forever.
+            deferred_timeout - seconds a deferred region's callback waits for
+                the region started when the page was rendered. If the region
+                hadn't started yet it's computed by the callback instead,
+                otherwise the callback fails with a TimeoutError. None waits
+                forever.
     """
 
     def __init__(self, app: Dash, ctrls: List[ControllerBase],
-                 error_404: html.Div, footer=html.Div()):
+                 error_404: html.Div, footer=html.Div(),
+                 nav_callback_mode=NavCallbackMode.PER_PAGE,
+                 state_store: Optional[StateStore] = None,
+                 warm_up=True,
+                 metrics: Optional[Metrics] = None,
+                 metrics_path='/metrics',
+                 process_pool_size=0,
+                 deferred_workers=4,
+                 client_cache_size=0,
+                 data_cache: Optional[DataCache] = None,
+                 warm_up_urls: Union[bool, List[str]] = False,
+                 warm_up_workers=4,
+                 health_path: Optional[str] = '/health',
+                 compressor: Optional[Compressor] = None,
+                 prerendered_dir: Optional[str] = None,
+                 async_timeout: Optional[float] = 120,
+                 deferred_timeout: Optional[float] = 120):
         self.ctrls = ctrls
         self.app = app
         self.error_404 = error_404
+        self.nav_callback_mode = nav_callback_mode
+        self.state_store = state_store
+        self.metrics = metrics
+        self._time = metrics.time if metrics is not None else no_timer
+        self.process_pool_size = process_pool_size
+        self._process_pool: Optional[ProcessPool] = None
+        self._pool_lock = threading.Lock()
+        # The pool each submitted job runs in
+        self._job_pools: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        if process_pool_size:
+            atexit.register(self.shutdown)
+        # Event loop for async layouts and callbacks, started on first use
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+        self.async_timeout = async_timeout
+        # Threads don't survive a fork, see _check_fork
+        self._pid = os.getpid()
+        self.deferred_workers = deferred_workers
+        self.deferred_timeout = deferred_timeout
+        # Started on first use, like the process pool
+        self._deferred_pool: Optional[futures.ThreadPoolExecutor] = None
+        # Regions started when their page was rendered, waiting for the
+        # region's callback to collect them
+        self._deferred: 'OrderedDict[Hashable, futures.Future]' = OrderedDict()
+        self._deferred_lock = threading.Lock()
+        # Lets callbacks find this controller through flask.current_app
+        app.server.extensions['dash_multipage'] = self
         self.logger = logging.getLogger(os.path.basename(__file__))
+        self.data_cache = data_cache if data_cache is not None else DataCache()
+        self.routes = RouteTable()
+        for ctrl in self.ctrls:
+            self.routes.add(ctrl.get_link_info().page_path, ctrl)
+            ctrl.data_cache = self.data_cache
+            if isinstance(ctrl, LazyController):
+                ctrl.on_load(self._set_data_cache)
+        # Created on first use so lazy controllers aren't loaded to check if
+        # they're cacheable
+        self.layout_caches: Dict[str, LRUCache] = {}
+        self.lazy_ctrls = [ctrl for ctrl in self.ctrls
+                           if isinstance(ctrl, LazyController)]
+        # Pages with path parameters can't be linked to without a value
+        self.nav_ctrls = [ctrl for ctrl in self.ctrls
+                          if not is_pattern(ctrl.get_link_info().page_path)]
+        self.client_cache_size = client_cache_size
+        self.client_cached_ctrls = [ctrl for ctrl in self.nav_ctrls
+                                    if ctrl.client_cacheable]
+        page_content = [html.Div(id=PAGE_CONTENT_ID, children=[])]
+        if client_cache_size:
+            page_content += [
+                html.Div(id=self._page_container_id(ctrl), children=[],
+                         style={'display': 'none'})
+                for ctrl in self.client_cached_ctrls]
+            page_content += [dcc.Store(id=PAGE_CACHE_ID),
+                             dcc.Store(id=PAGE_REQUEST_ID)]
+        # Pages that opted in to being updated in place on query changes
+        self.in_place_ctrls = [] if client_cache_size else [
+            ctrl for ctrl in self.ctrls if ctrl.update_in_place]
+        if self.in_place_ctrls:
+            page_content.append(dcc.Store(id=PAGE_ROUTE_ID))
+            self._display_page_output = '..{}.children...{}.data..'.format(
+                PAGE_CONTENT_ID, PAGE_ROUTE_ID)
+        else:
+            self._display_page_output = PAGE_CONTENT_ID + '.children'
+        # page_link_ids of the pages updated in place on query changes
+        self.in_place_ids: Set[str] = set()
 
         nav_tab_html = [
             html.Li(
                 dcc.Link(
                     ctrls.get_link_info().link_text,
                     href=ctrls.get_link_info().page_path,
-                    className='nav-link',
+                    className=NAV_LINK_CLASS,
                     id=ctrls.get_link_info().page_link_id, ),
-                className='nav-item') for ctrls in self.ctrls
+                className='nav-item') for ctrls in self.nav_ctrls
         ]
         self.top_layout = html.Div(children=[
             html.H4(),
@@ -59,7 +303,7 @@ class MultiPageDashController():
                 id='nav-bar'),
             dcc.Location(id=URL_ID, refresh=False),
             html.Br(),
-            html.Div(id='page-content', children=[]),
+            *page_content,
             html.Br(),
             html.Br(),
             html.Br(),
@@ -69,8 +313,60 @@ class MultiPageDashController():
             footer,
             html.Br(),
         ], className='container', )
+        self._validation_layout: Optional[html.Div] = None
+        self._validation_refreshed = False
         app.layout = self._serve_layout
+        # The nav bar, footer and 404 page never change, so they're
+        # serialised once instead of on every request
+        self._error_404_json = snapshot_layout(error_404)
+        self.compressor = compressor
+        self._layout_json = b''
+        self._layout_etag = ''
+        # Compressed _layout_json by content encoding
+        self._layout_encoded: Dict[str, bytes] = {}
+        self._cache_layout_json()
+        self._wrap_view('_dash-layout', self._serve_cached_layout)
+        self._update_path = (app.config.routes_pathname_prefix +
+                             '_dash-update-component')
+        if compressor is not None:
+            app.server.after_request(self._compress_response)
+        # Serialised layouts by page_key
+        self.prerendered: Dict[str, mmap.mmap] = {}
+        if prerendered_dir is not None:
+            self.prerendered = load_prerendered(prerendered_dir)
+            if not client_cache_size:
+                self._wrap_view('_dash-update-component',
+                                self._serve_prerendered)
+        if metrics is not None:
+            self._instrument(metrics_path)
+        # After _instrument, so the metrics time the whole async callback
+        self._support_async_callbacks()
         self._register_callbacks()
+        if warm_up_urls is True:
+            warm_up_urls = [ctrl.get_link_info().page_path
+                            for ctrl in self.nav_ctrls]
+        self.warm_up_urls: List[str] = list(warm_up_urls or [])
+        self.warm_up_workers = warm_up_workers
+        self.ready = threading.Event()
+        if health_path is not None:
+            app.server.add_url_rule(health_path, 'dash_multipage_health',
+                                    self._serve_health)
+        if self.lazy_ctrls:
+            # Browsers must get the callbacks of every page with the
+            # dependencies, so that request waits for the lazy pages to load
+            self._dependencies_path = (app.config.routes_pathname_prefix +
+                                       '_dash-dependencies')
+            # Dash's endpoint names for the index page
+            self._index_endpoints = {app.config.routes_pathname_prefix,
+                                     app.config.routes_pathname_prefix +
+                                     '<path:path>'}
+            app.server.before_request(self._load_before_dependencies)
+        if warm_up and (self.lazy_ctrls or self.warm_up_urls):
+            threading.Thread(target=self._warm_up,
+                             name='dash-multipage-warm-up',
+                             daemon=True).start()
+        else:
+            self.ready.set()
 
     def _serve_layout(self) -> html.Div:
         # See "Dynamically Create a Layout for Multi-Page App Validation"
@@ -79,18 +375,526 @@ class MultiPageDashController():
             # Normal operation
             return self.top_layout
         # Only returned for initial callback validation
-        return html.Div([self.top_layout] + [ctrl.layout({})
-                                             for ctrl in self.ctrls])
+        return self._build_validation_layout()
+
+    def _build_validation_layout(self) -> html.Div:
+        """ Return the top level layout with every page's skeleton
+        """
+        if self._validation_layout is not None:
+            return self._validation_layout
+        validation_layout = html.Div(
+            [self.top_layout] + [self.resolve(ctrl.skeleton())
+                                 for ctrl in self.ctrls])
+        # Lazy pages are left out until loaded, so don't cache before then
+        if all(ctrl.loaded for ctrl in self.lazy_ctrls):
+            self._validation_layout = validation_layout
+        return validation_layout
+
+    def load_lazy_ctrls(self) -> None:
+        """ Load every LazyController page that isn't loaded yet
+        """
+        for ctrl in self.lazy_ctrls:
+            try:
+                ctrl.load()
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception('Failed to load %s',
+                                      ctrl.get_link_info().page_link_id)
+        self._refresh_validation_layout()
+
+    def _refresh_validation_layout(self) -> None:
+        """ Add the lazy pages' skeletons to app.validation_layout
+
+            Dash builds it once when app.layout is set, while the lazy pages
+            are still empty, and sends it to the browser with the index page.
+        """
+        if (self._validation_refreshed or
+                getattr(self.app, 'validation_layout', None) is None or
+                not all(ctrl.loaded for ctrl in self.lazy_ctrls)):
+            return
+        self.app.validation_layout = _validation_clone(
+            self._build_validation_layout())
+        self._validation_refreshed = True
+
+    def _warm_up(self) -> None:
+        """ Load the lazy pages and render warm_up_urls, then set ready
+        """
+        try:
+            self.load_lazy_ctrls()
+            if self.warm_up_urls:
+                with futures.ThreadPoolExecutor(
+                        self.warm_up_workers,
+                        thread_name_prefix='dash-multipage-warm-up') as pool:
+                    list(pool.map(self.warm_up_url, self.warm_up_urls))
+        finally:
+            self.ready.set()
+            self.logger.info('Warm up done')
+
+    def warm_up_url(self, url: str) -> None:
+        """ Render the page at url and run the callbacks fired when it loads
+            with its initial values, so their caches are filled
+        """
+        try:
+            with self.app.server.test_request_context():
+                layout = self._render_page(url)
+            components = dict(_iter_components(json.loads(json.dumps(
+                layout, cls=plotly.utils.PlotlyJSONEncoder))))
+            client = self.app.server.test_client()
+            for body in self._initial_callback_requests(components):
+                response = client.post(self.app.config.routes_pathname_prefix +
+                                       '_dash-update-component', json=body)
+                if response.status_code not in (200, 204):
+                    self.logger.warning('Warm up of %s callback %s failed '
+                                        'with %d', url, body['output'],
+                                        response.status_code)
+        except Exception:  # pylint: disable=broad-except
+            self.logger.exception('Failed to warm up %s', url)
+
+    def _initial_callback_requests(
+            self, components: Dict[str, Dict]) -> Iterator[Dict]:
+        """ Yield the callback request bodies the browser would send when a
+            page with the components (id: props) loads
+        """
+        for callback in _callback_list(self.app):
+            if (callback.get('prevent_initial_call') or
+                    callback.get('clientside_function')):
+                continue
+            output = callback['output']
+            multi = output.startswith('..')
+            outputs = callback['outputs']
+            if not all(dep['id'] in components
+                       for dep in outputs + callback['inputs']):
+                continue
+
+            def with_values(deps):
+                return [dict(dep, value=components[dep['id']].get(
+                    dep['property'])) for dep in deps]
+            yield {
+                'output': output,
+                'outputs': outputs if multi else outputs[0],
+                'inputs': with_values(callback['inputs']),
+                'state': with_values(
+                    dep for dep in callback['state']
+                    if dep['id'] in components),
+                'changedPropIds': [],
+            }
+
+    def _serve_health(self) -> flask.Response:
+        if self.ready.is_set():
+            return flask.jsonify(status='ok')
+        return flask.make_response(flask.jsonify(status='warming up'), 503)
+
+    def _load_before_dependencies(self) -> None:
+        """ flask before_request hook that loads the lazy pages before the
+            callback dependencies are served, and before the index page if
+            it includes dash's validation layout
+        """
+        if (flask.request.path == self._dependencies_path or
+                flask.request.endpoint in self._index_endpoints and
+                not self._validation_refreshed and
+                getattr(self.app, 'validation_layout', None) is not None):
+            self.load_lazy_ctrls()
+
+    def startup_report(self) -> Dict[str, Optional[float]]:
+        """ Return the seconds each LazyController page took to import and
+            create keyed by page_link_id, or None if it isn't loaded yet
+        """
+        return {ctrl.get_link_info().page_link_id: ctrl.load_time
+                for ctrl in self.lazy_ctrls}
+
+    def _cache_layout_json(self) -> None:
+        """ Serialise top_layout for _serve_cached_layout
+        """
+        self._layout_json = json.dumps(
+            self.top_layout, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8')
+        self._layout_etag = hashlib.md5(self._layout_json).hexdigest()
+        self._layout_encoded = {}
+
+    def _wrap_view(self, name: str,
+                   serve: Callable[[], Optional[flask.Response]]) -> None:
+        """ Have dash's view for the named route answer with serve(), or
+            handle the request itself when serve() returns None
+
+            Unlike a before_request hook, this keeps the route behind wrappers
+            like dash-auth's that protect the view functions, if they're added
+            after the controller is created. If the view is already wrapped,
+            serve() isn't used so it can't bypass the wrapper.
+        """
+        endpoint = self.app.config.routes_pathname_prefix + name
+        view = self.app.server.view_functions.get(endpoint)
+        if getattr(view, '__self__', None) is not self.app:
+            self.logger.warning('%s is already wrapped, create the '
+                                'MultiPageDashController before adding '
+                                'authentication to serve it faster', endpoint)
+            return
+
+        @functools.wraps(view)
+        def _view(*args, **kwargs):
+            response = serve()
+            if response is None:
+                return view(*args, **kwargs)
+            return response
+        self.app.server.view_functions[endpoint] = _view
+
+    def _serve_cached_layout(self) -> Optional[flask.Response]:
+        """ Serve the layout endpoint from the pre-serialised top_layout
+
+            Wraps dash's _dash-layout view. Supports If-None-Match conditional
+            requests.
+        """
+        encoding = self._response_encoding(len(self._layout_json))
+        if encoding is None:
+            response = flask.Response(self._layout_json,
+                                      mimetype='application/json')
+            response.set_etag(self._layout_etag)
+        else:
+            body = self._layout_encoded.get(encoding)
+            if body is None:
+                body = self.compressor.compress(  # type: ignore
+                    self._layout_json, encoding)
+                self._layout_encoded[encoding] = body
+            else:
+                self.compressor.record(  # type: ignore
+                    len(self._layout_json), len(body))
+            response = flask.Response(body, mimetype='application/json')
+            response.headers['Content-Encoding'] = encoding
+            response.set_etag('{}-{}'.format(self._layout_etag, encoding))
+        if self.compressor is not None:
+            response.vary.add('Accept-Encoding')
+        return response.make_conditional(flask.request)
+
+    def _response_encoding(self, size: int) -> Optional[str]:
+        """ Return the encoding to compress a response of size bytes to the
+            current request with, or None to not compress it
+        """
+        if self.compressor is None or size < self.compressor.min_size:
+            return None
+        return self.compressor.choose(flask.request.accept_encodings)
+
+    def _compress_response(self, response: flask.Response) -> flask.Response:
+        """ flask after_request hook compressing callback responses
+        """
+        if (flask.request.path != self._update_path or
+                response.status_code != 200 or response.direct_passthrough or
+                'Content-Encoding' in response.headers):
+            return response
+        data = response.get_data()
+        encoding = self._response_encoding(len(data))
+        if encoding is None:
+            return response
+        response.set_data(self.compressor.compress(  # type: ignore
+            data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def _instrument(self, metrics_path: str) -> None:
+        """ Time callbacks registered through app.callback, record callback
+            response sizes and serve the metrics
+        """
+        metrics = self.metrics
+        register = self.app.callback
+
+        def _timed_register(*args, **kwargs):
+            output = kwargs.get('output', args[0] if args else None)
+            outputs = output if isinstance(output, list) else [output]
+            label = ','.join('{}.{}'.format(out.component_id,
+                                            out.component_property)
+                             for out in outputs)
+            decorator = register(*args, **kwargs)
+
+            def _wrap(func):
+                return decorator(metrics.wrap_callback(func, label))
+            return _wrap
+        self.app.callback = _timed_register
+
+        @self.app.server.after_request
+        def _record_response_size(response: flask.Response) -> flask.Response:
+            if flask.request.path.endswith('_dash-update-component'):
+                label = getattr(flask.g, 'dash_multipage_route', None)
+                if label is None:
+                    body = flask.request.get_json(silent=True) or {}
+                    label = str(body.get('output', ''))
+                metrics.observe('response_bytes', label,
+                                response.calculate_content_length() or 0)
+            return response
+
+        def _serve_metrics():
+            return flask.Response(metrics.prometheus(),
+                                  mimetype='text/plain; version=0.0.4')
+        self.app.server.add_url_rule(metrics_path, 'dash_multipage_metrics',
+                                     _serve_metrics)
+
+    def layout_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """ Return the layout cache counters for each cacheable page keyed by
+            page_link_id
+        """
+        return {link_id: cache.stats()
+                for link_id, cache in self.layout_caches.items()}
+
+    def memory_report(self) -> Dict[str, Dict[str, int]]:
+        """ Return the estimated bytes retained by each page's controller and
+            components, and by its cached layouts, keyed by page_link_id
+
+            The top level layout, 404 page and frozen subtrees are reported
+            under 'shared'. Each object is counted once, under the first entry
+            that references it, so subtrees frozen with cache.freeze aren't
+            counted again in each cached layout.
+        """
+        seen: Set[int] = set()
+        report = {'shared': {
+            'components': retained_size(
+                [self.top_layout, self.error_404, self._error_404_json,
+                 self._layout_json, frozen_objects()], seen),
+            'cached_layouts': 0,
+        }}
+        for ctrl in self.ctrls:
+            link_id = ctrl.get_link_info().page_link_id
+            cache = self.layout_caches.get(link_id)
+            report[link_id] = {
+                'components': retained_size(ctrl, seen),
+                'cached_layouts': retained_size(cache, seen) if cache else 0,
+            }
+        return report
+
+    def submit(self, func: Callable, *args) -> futures.Future:
+        """ Run func(*args) in the process pool, which is started on first use
+        """
+        self._check_fork()
+        with self._pool_lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPool(self.process_pool_size)
+            pool = self._process_pool
+            future = pool.submit(func, *args)
+            self._job_pools[future] = pool
+        return future
+
+    def terminate_job(self, future: futures.Future) -> None:
+        """ Terminate the worker process running future's job. The pool
+            starts a new worker in its place, and other jobs aren't affected.
+        """
+        with self._pool_lock:
+            pool = self._job_pools.get(future)
+        if pool is not None and pool.terminate(future):
+            self.logger.warning('Terminated a worker process to stop a timed '
+                                'out job')
+
+    def _set_data_cache(self, ctrl: ControllerBase) -> None:
+        ctrl.data_cache = self.data_cache
+
+    def _check_fork(self) -> None:
+        """ Forget the event loop and pools started by the parent process if
+            this is a forked child, like a gunicorn --preload worker. Their
+            threads aren't running in the child, so anything posted to them
+            would never finish.
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        self._pid = pid
+        # The parent's lock may have been held by another thread at the fork
+        self._loop_lock = threading.Lock()
+        self._loop = None
+        self._loop_thread = None
+        self._deferred_lock = threading.Lock()
+        self._deferred_pool = None
+        self._deferred = OrderedDict()
+        self._pool_lock = threading.Lock()
+        self._process_pool = None
+        self._job_pools = weakref.WeakKeyDictionary()
+
+    def run_async(self, awaitable: Any, timeout: Optional[float] = None) -> Any:
+        """ Run awaitable on the controller's event loop and return its result
+
+            The loop runs in a background thread started on first use, and is
+            shared by every async layout and callback, so their awaits overlap.
+            The calling thread still waits for the result, for at most timeout
+            seconds, or async_timeout if not given. On timeout the coroutine
+            is cancelled and futures.TimeoutError raised.
+        """
+        self._check_fork()
+        if timeout is None:
+            timeout = self.async_timeout
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name='dash-multipage-asyncio',
+                    daemon=True)
+                self._loop_thread.start()
+            loop = self._loop
+        if threading.current_thread() is self._loop_thread:
+            raise RuntimeError('run_async called from the event loop, await '
+                               'the coroutine instead')
+        if not asyncio.iscoroutine(awaitable):
+            awaitable = _await(awaitable)
+        future = asyncio.run_coroutine_threadsafe(awaitable, loop)
+        try:
+            return future.result(timeout)
+        except futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def resolve(self, value: Any) -> Any:
+        """ Return value, or its result if it's awaitable, like the result of
+            an async layout
+        """
+        if inspect.isawaitable(value):
+            return self.run_async(value)
+        return value
+
+    def _call(self, func: Callable, *args) -> Any:
+        return self.resolve(func(*args))
+
+    def _support_async_callbacks(self) -> None:
+        """ Make app.callback accept async def callbacks, which are run on the
+            controller's event loop
+        """
+        register = self.app.callback
+
+        def _async_register(*args, **kwargs):
+            decorator = register(*args, **kwargs)
+
+            def _wrap(func):
+                if asyncio.iscoroutinefunction(func):
+                    async_func = func
+
+                    @functools.wraps(async_func)
+                    def func(*args, **kwargs):
+                        return self.run_async(async_func(*args, **kwargs))
+                return decorator(func)
+            return _wrap
+        self.app.callback = _async_register
+
+    def shutdown(self, wait=True) -> None:
+        """ Stop the process pool, the deferred region threads, the data
+            cache's refresh threads and the event loop. The process pool,
+            deferred region threads and event loop are restarted if used
+            again.
+        """
+        with self._deferred_lock:
+            deferred_pool = self._deferred_pool
+            self._deferred_pool = None
+        if deferred_pool is not None:
+            deferred_pool.shutdown(wait=wait)
+        self.data_cache.shutdown(wait=wait)
+        with self._loop_lock:
+            loop = self._loop
+            self._loop = None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+        with self._pool_lock:
+            pool = self._process_pool
+            self._process_pool = None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    def _start_deferred(self, ctrl: ControllerBase, args: Dict) -> None:
+        """ Start computing the controller's deferred regions for the args,
+            which include the render's RENDER_KEY
+        """
+        data_key = json.dumps(args, sort_keys=True)
+        region_args = _without_render_key(args)
+        self._check_fork()
+        with self._deferred_lock:
+            if self._deferred_pool is None:
+                self._deferred_pool = futures.ThreadPoolExecutor(
+                    self.deferred_workers,
+                    thread_name_prefix='dash-multipage-deferred')
+            for name, func in ctrl.deferred_regions().items():
+                key = (ctrl.deferred_region_id(name), data_key)
+                self._deferred[key] = self._deferred_pool.submit(
+                    self._call, func, region_args)
+            # Drop regions whose page was left before they were collected
+            while len(self._deferred) > MAX_PENDING_DEFERRED:
+                _, future = self._deferred.popitem(last=False)
+                future.cancel()
+
+    def _register_deferred_callbacks(self, ctrl: ControllerBase) -> None:
+        """ Register a callback filling in each of the controller's deferred
+            regions
+        """
+        def generate_region_update(region_id: str, func: Callable):
+            @self.app.callback(Output(region_id, 'children'),
+                               [Input(region_id + '-args', 'data')])
+            def _update_region(args):
+                key = (region_id, json.dumps(args, sort_keys=True))
+                self._check_fork()
+                with self._deferred_lock:
+                    future = self._deferred.pop(key, None)
+                if future is not None:
+                    try:
+                        return future.result(self.deferred_timeout)
+                    except futures.TimeoutError:
+                        # Still running, computing it again won't be faster
+                        if not future.cancel():
+                            raise
+                return self._call(func, _without_render_key(args))
+
+        for name, func in ctrl.deferred_regions().items():
+            generate_region_update(ctrl.deferred_region_id(name), func)
+
+    def callback_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """ Return the cache counters for each memoized callback registered
+            with the app keyed by the callback's module and name
+        """
+        stats = {}
+        for callback in self.app.callback_map.values():
+            # The wrappers around a memoized callback copy its attributes
+            func = callback['callback']
+            if hasattr(func, 'cache_stats'):
+                stats[func.cache_name] = func.cache_stats()
+        return stats
+
+    def _render_layout(self, ctrl: ControllerBase, route: str,
+                       args: Dict) -> Any:
+        """ Return the controller's layout, using the layout cache if the
+            controller is cacheable
+        """
+        link_id = ctrl.get_link_info().page_link_id
+        cache = self.layout_caches.get(link_id)
+        if cache is None:
+            if not ctrl.cacheable:
+                return self.resolve(ctrl.layout(args))
+            cache = self.layout_caches.setdefault(
+                link_id, LRUCache(ctrl.cache_size, ctrl.cache_ttl))
+        key = args_key(route, args)
+        layout = cache.get(key)
+        if layout is None:
+            layout = snapshot_layout(self.resolve(ctrl.layout(args)))
+            cache.put(key, layout)
+        return layout
+
+    def _register_nav_callback(self) -> None:
+        """ Register a single callback that updates every nav-link
+        """
+        outputs = [Output(ctrl.get_link_info().page_link_id, 'className')
+                   for ctrl in self.nav_ctrls]
+        inputs = [Input(URL_ID, 'pathname')]
+        if self.nav_callback_mode == NavCallbackMode.CLIENTSIDE:
+            paths = [ctrl.get_link_info().page_path for ctrl in self.nav_ctrls]
+            self.app.clientside_callback(
+                _CLIENTSIDE_NAV_UPDATE % (json.dumps(paths),
+                                          NAV_LINK_ACTIVE_CLASS,
+                                          NAV_LINK_CLASS),
+                outputs, inputs)
+            return
+
+        @self.app.callback(outputs, inputs)
+        def _update_navlinks(pathname):
+            match = self.routes.match(pathname or '')
+            active = match[0] if match is not None else None
+            return [NAV_LINK_ACTIVE_CLASS if ctrl is active else NAV_LINK_CLASS
+                    for ctrl in self.nav_ctrls]
 
     def _register_callbacks(self) -> None:
-        def generate_navlink_update(url: str, id_str: str):
+        def generate_navlink_update(ctrl: ControllerBase, id_str: str):
             """Create a dash callback function to update a nav-link element class based
             on the current selected page
 
             Parameters
             ----------
-            url : str
-            url of nav-link href
+            ctrl : ControllerBase
+            controller the nav-link points to
             id_str : str
             id of nav-link element
 
@@ -105,31 +909,305 @@ class MultiPageDashController():
                 Input(URL_ID, 'pathname'),
             ])
             def _update_navlink(pathname):
-                if pathname == url:
-                    return 'nav-link active'
-                return 'nav-link'
+                match = self.routes.match(pathname or '')
+                if match is not None and match[0] is ctrl:
+                    return NAV_LINK_ACTIVE_CLASS
+                return NAV_LINK_CLASS
 
+        if self.nav_callback_mode == NavCallbackMode.PER_PAGE:
+            for ctrl in self.nav_ctrls:
+                generate_navlink_update(ctrl, ctrl.get_link_info().page_link_id)
+        elif self.nav_ctrls:
+            self._register_nav_callback()
         for ctrl in self.ctrls:
-            generate_navlink_update(ctrl.get_link_info().page_path,
-                                    ctrl.get_link_info().page_link_id)
             ctrl.register_callbacks(self.app)
+            if isinstance(ctrl, LazyController):
+                ctrl.on_load(self._register_deferred_callbacks)
+            else:
+                self._register_deferred_callbacks(ctrl)
+        for ctrl in self.in_place_ctrls:
+            if isinstance(ctrl, LazyController):
+                ctrl.on_load(self._register_in_place_update)
+            else:
+                self._register_in_place_update(ctrl)
+
+        if self.client_cache_size:
+            self._register_client_cache_callbacks()
+            return
+
+        if not self.in_place_ctrls:
+            @self.app.callback(
+                Output(PAGE_CONTENT_ID, 'children'),
+                [Input(URL_ID, 'href')])
+            def _display_page(href: str):
+                """Handle URL changes for whole app
+                """
+                return self._render_page(href)
+            return
+
+        # no_update isn't available in older dash versions
+        from dash import no_update  # pylint: disable=import-outside-toplevel
 
         @self.app.callback(
-            Output('page-content', 'children'), [
-                Input(URL_ID, 'href'),
-            ])
-        def _display_page(href: str):
+            [Output(PAGE_CONTENT_ID, 'children'),
+             Output(PAGE_ROUTE_ID, 'data')],
+            [Input(URL_ID, 'href')],
+            [State(PAGE_ROUTE_ID, 'data')])
+        def _display_page(href: str, current_route: Optional[str]):
             """Handle URL changes for whole app
             """
-            self.logger.info("Loading path: %s", href)
-            # The framework can occasionally pass in 'None' while loading.
-            if href is None:
-                return 'Loading.....'
-            try:
+            route = self._in_place_route(href)
+            if route is not None and route == current_route:
+                # The page's in place update callback handles it
+                return no_update, no_update
+            return self._render_page(href), route
+
+    def _in_place_route(self, href: Optional[str]) -> Optional[str]:
+        """ Return the route of the URL if its page is updated in place on
+            query changes, otherwise None
+        """
+        if not href or not self.in_place_ids:
+            return None
+        try:
+            route, _ = parse_href(href)
+        except BaseException:  # pylint: disable=bare-except
+            return None
+        match = self.routes.match(route)
+        if (match is None or
+                match[0].get_link_info().page_link_id not in self.in_place_ids):
+            return None
+        return route
+
+    def _register_in_place_update(self, ctrl: ControllerBase) -> None:
+        """ Register a callback setting the values of the controller's URLArgs
+            components that differ from the URL's when only the query changes
+
+            Pages without URLArgs, with deferred regions, or whose components
+            are already the output of another callback, are always rendered
+            again instead.
+        """
+        # no_update isn't available in older dash versions
+        from dash import no_update  # pylint: disable=import-outside-toplevel
+
+        url_args = getattr(ctrl, 'url_args', None)
+        if (not isinstance(url_args, URLArgs) or
+                not url_args.linked_components or ctrl.deferred_regions()):
+            return
+        schema = url_args.schema
+        deps = [(arg.info.component.id, arg.info.value_name) for arg in schema]
+        used = {(dep['id'], dep['property'])
+                for callback in _callback_list(self.app)
+                for dep in callback['outputs']}
+        if any(dep in used for dep in deps):
+            return
+        link_id = ctrl.get_link_info().page_link_id
+
+        @self.app.callback([Output(*dep) for dep in deps],
+                           [Input(URL_ID, 'href')],
+                           [State(*dep) for dep in deps],
+                           prevent_initial_call=True)
+        def _update_in_place(href: str, *current):
+            page = self._match_href(href) if href else None
+            if page is None or page[0].get_link_info().page_link_id != link_id:
+                return [no_update] * len(deps)
+            decoded = url_args.decode(page[2])
+            return [no_update if decoded[arg.key] == value
+                    else decoded[arg.key]
+                    for arg, value in zip(schema, current)]
+
+        self.in_place_ids.add(link_id)
+
+    @staticmethod
+    def _page_container_id(ctrl: ControllerBase) -> str:
+        return '{}/{}'.format(PAGE_CONTENT_ID, ctrl.get_link_info().page_link_id)
+
+    def _register_client_cache_callbacks(self) -> None:
+        """ Register the callbacks for the client side page cache
+        """
+        # no_update isn't available in older dash versions
+        from dash import no_update  # pylint: disable=import-outside-toplevel
+
+        pages = {ctrl.get_link_info().page_path: ctrl.get_link_info().page_link_id
+                 for ctrl in self.client_cached_ctrls}
+        self.app.clientside_callback(
+            _CLIENTSIDE_PAGE_CACHE % (json.dumps(pages), self.client_cache_size),
+            [Output(PAGE_CACHE_ID, 'data'), Output(PAGE_REQUEST_ID, 'data'),
+             Output(PAGE_CONTENT_ID, 'style')] +
+            [Output(self._page_container_id(ctrl), 'style')
+             for ctrl in self.client_cached_ctrls],
+            [Input(URL_ID, 'href')],
+            [State(PAGE_CACHE_ID, 'data')])
+
+        @self.app.callback(
+            [Output(PAGE_CONTENT_ID, 'children')] +
+            [Output(self._page_container_id(ctrl), 'children')
+             for ctrl in self.client_cached_ctrls],
+            [Input(PAGE_REQUEST_ID, 'data')])
+        def _display_cached_page(request):
+            """Render the pages the client side cache doesn't have
+            """
+            if not request:
+                return [no_update] * (len(self.client_cached_ctrls) + 1)
+            page = self._render_page(request['href'])
+            outputs = [page if request['target'] is None else no_update]
+            for ctrl in self.client_cached_ctrls:
+                link_id = ctrl.get_link_info().page_link_id
+                if link_id == request['target']:
+                    outputs.append(page)
+                elif link_id in request['evict']:
+                    outputs.append([])
+                else:
+                    outputs.append(no_update)
+            return outputs
+
+    def _render_page(self, href: str) -> Any:
+        """ Return the page content for a URL
+        """
+        self.logger.info("Loading path: %s", href)
+        # The framework can occasionally pass in 'None' while loading.
+        if href is None:
+            return 'Loading.....'
+        page = self._match_href(href)
+        if page is None:
+            return self._error_404_json
+        ctrl, route, args = page
+        link_id = ctrl.get_link_info().page_link_id
+        if self.metrics is not None:
+            flask.g.dash_multipage_route = link_id
+        prerendered = self.prerendered.get(page_key(route, args))
+        if prerendered is not None:
+            return json.loads(prerendered[:])
+        if not ctrl.deferred_regions():
+            with self._time('layout_seconds', link_id):
+                return self._render_layout(ctrl, route, args)
+        # Each render gets its own regions, so its layout isn't cached
+        args = dict(args)
+        args[RENDER_KEY] = [uuid.uuid4().hex]
+        with self._time('layout_seconds', link_id):
+            layout = self.resolve(ctrl.layout(args))
+        self._start_deferred(ctrl, args)
+        return layout
+
+    def _serve_prerendered(self) -> Optional[flask.Response]:
+        """ Answer _display_page requests for prerendered URLs with the
+            exported layout, without parsing or serialising it
+
+            Wraps dash's _dash-update-component view. Returns None to have
+            dash handle the request normally.
+        """
+        body = flask.request.get_json(silent=True) or {}
+        if body.get('output') != self._display_page_output:
+            return None
+        href = body['inputs'][0].get('value')
+        page = self._match_href(href) if href else None
+        if page is None:
+            return None
+        ctrl, route, args = page
+        data = self.prerendered.get(page_key(route, args))
+        page_route = self._in_place_route(href)
+        current_route = (body.get('state') or [{}])[0].get('value')
+        if data is None or (page_route is not None and
+                            page_route == current_route):
+            return None
+        if self.metrics is not None:
+            flask.g.dash_multipage_route = ctrl.get_link_info().page_link_id
+        route_data = b''
+        if self.in_place_ctrls:
+            route_data = b', "%s": {"data": %s}' % (
+                PAGE_ROUTE_ID.encode(), json.dumps(page_route).encode())
+        # Same response dash builds for _display_page
+        return flask.Response(b''.join((
+            b'{"response": {"%s": {"children": ' % PAGE_CONTENT_ID.encode(),
+            data, b'}', route_data, b'}, "multi": true}')),
+            mimetype='application/json')
+
+    def _match_href(self, href: str) -> Optional[
+            Tuple[ControllerBase, str, Dict[str, List[str]]]]:
+        """ Return the controller, route and layout args for a URL, or None
+            if no page matches
+        """
+        try:
+            with self._time('parse_href_seconds'):
                 route, args = parse_href(href)
-            except BaseException:  # pylint: disable=bare-except
-                return self.error_404
-            for ctrls in self.ctrls:
-                if route == ctrls.get_link_info().page_path:
-                    return ctrls.layout(args)
-            return self.error_404
+        except BaseException:  # pylint: disable=bare-except
+            return None
+        with self._time('dispatch_seconds'):
+            match = self.routes.match(route)
+        if match is None:
+            return None
+        ctrl, path_args = match
+        if self.state_store is not None and TOKEN_KEY in args:
+            try:
+                args = resolve_state(args, self.state_store)
+            except KeyError as err:
+                # Show the page with its defaults for expired links
+                self.logger.warning('%s', err)
+                args = {key: vals for key, vals in args.items()
+                        if key != TOKEN_KEY}
+        if path_args:
+            args = dict(args)
+            args.update({key: [val] for key, val in path_args.items()})
+        return ctrl, route, args
+
+
+def _validation_clone(layout: html.Div) -> html.Div:
+    """ Return a copy of layout with its components flattened and reduced to
+        their id and required props, like dash does for app.validation_layout
+    """
+    def clone(component, children=None):
+        cls = type(component)
+        sig = getattr(cls.__init__, '__signature__', None)
+        props = {
+            prop: getattr(component, prop)
+            for prop in component._prop_names  # pylint: disable=protected-access
+            if hasattr(component, prop) and (
+                prop == 'id' or not sig or
+                sig.parameters[prop].default == component.REQUIRED)}
+        if props.get('children', children):
+            props['children'] = children or []
+        return cls(**props)
+    return clone(layout, [clone(component) for component in
+                          layout._traverse_ids()])  # pylint: disable=protected-access
+
+
+def _without_render_key(args: Optional[Dict]) -> Optional[Dict]:
+    if not isinstance(args, dict) or RENDER_KEY not in args:
+        return args
+    return {key: vals for key, vals in args.items() if key != RENDER_KEY}
+
+
+async def _await(awaitable: Any) -> Any:
+    return await awaitable
+
+
+def _callback_list(app: Dash) -> List[Dict]:
+    """ Return the callbacks registered with a dash app, each with its
+        outputs split into a list of {'id', 'property'} dicts
+    """
+    # Older dash versions only have callback_map, without the initial call
+    # and clientside details
+    callbacks = getattr(app, '_callback_list', None) or [
+        dict(output=output, **callback)
+        for output, callback in app.callback_map.items()]
+    # Multi output callbacks are keyed as ..id1.prop1...id2.prop2..
+    return [dict(callback, outputs=[
+        dict(zip(('id', 'property'), output.rsplit('.', 1)))
+        for output in callback['output'].strip('.').split('...')])
+            for callback in callbacks]
+
+
+def _iter_components(node: Any) -> Iterator[Any]:
+    """ Yield (id, props) for each component with a string id in a layout
+        serialised to JSON
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            props = node.get('props')
+            if isinstance(props, dict) and 'type' in node:
+                if isinstance(props.get('id'), str):
+                    yield props['id'], props
+                stack.extend(props.values())
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+""" Export page layouts to files that MultiPageDashController can serve
+    without rendering them
+
+    Run from the app's directory with:
+    python -m dash_multipage.prerender multipage_app:PAGE_CTRL --out prerendered
+
+    then pass prerendered_dir='prerendered' to MultiPageDashController. The
+    files must be exported again when the pages change.
+"""
+
+from typing import Any, Dict, List, Optional
+import argparse
+import hashlib
+import importlib
+import json
+import logging
+import os
+import sys
+
+import plotly
+
+from dash_multipage.cache import MANIFEST, page_key
+from dash_multipage.version import __version__
+
+LOGGER = logging.getLogger(os.path.basename(__file__))
+
+
+def default_urls(page_ctrl: Any) -> List[str]:
+    """ Return the path of each page without path parameters, which renders
+        with its URLArgs defaults
+    """
+    return [ctrl.get_link_info().page_path for ctrl in page_ctrl.nav_ctrls]
+
+
+def prerender(page_ctrl: Any, out_dir: str,
+              urls: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """ Write the serialised layout of each URL to out_dir with a manifest,
+        and return the manifest's pages
+
+        urls defaults to default_urls. URLs that don't match a page are
+        skipped.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    pages: Dict[str, Dict[str, Any]] = {}
+    for url in urls if urls is not None else default_urls(page_ctrl):
+        page = page_ctrl._match_href(url)  # pylint: disable=protected-access
+        if page is None:
+            LOGGER.warning('No page for %s, skipping it', url)
+            continue
+        ctrl, route, args = page
+        with page_ctrl.app.server.test_request_context():
+            layout = page_ctrl.resolve(ctrl.layout(args))
+        data = json.dumps(layout, cls=plotly.utils.PlotlyJSONEncoder).encode(
+            'utf-8')
+        key = page_key(route, args)
+        file_name = '{}.json'.format(
+            hashlib.sha1(key.encode('utf-8')).hexdigest()[:16])
+        with open(os.path.join(out_dir, file_name), 'wb') as out_file:
+            out_file.write(data)
+        pages[key] = {'url': url, 'file': file_name, 'bytes': len(data)}
+    with open(os.path.join(out_dir, MANIFEST), 'w') as manifest_file:
+        json.dump({'version': __version__, 'pages': pages}, manifest_file,
+                  indent=2, sort_keys=True)
+    return pages
+
+
+def main(argv: List[str] = None) -> None:
+    """ Export the pages of the MultiPageDashController named by a
+        'module:name' argument
+    """
+    parser = argparse.ArgumentParser(
+        description='Export page layouts for MultiPageDashController\'s '
+                    'prerendered_dir')
+    parser.add_argument('controller',
+                        help="the MultiPageDashController as 'module:name'")
+    parser.add_argument('--out', required=True, help='output directory')
+    parser.add_argument('--url', action='append',
+                        help='URL to export in addition to the default page '
+                             'URLs, for example /app2?app2dropdown=NYC')
+    args = parser.parse_args(argv)
+    module_name, _, attr = args.controller.partition(':')
+    sys.path.insert(0, '.')
+    page_ctrl = getattr(importlib.import_module(module_name), attr)
+    page_ctrl.load_lazy_ctrls()
+    pages = prerender(page_ctrl, args.out,
+                      default_urls(page_ctrl) + (args.url or []))
+    for key, page in sorted(pages.items()):
+        print('{:<48} {:>8} bytes  {}'.format(key, page['bytes'],
+                                              page['file']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+""" Process pool whose jobs can be stopped one at a time
+
+    concurrent.futures.ProcessPoolExecutor breaks every running job when one
+    of its workers is terminated, so a single stuck job can only be stopped by
+    replacing the whole pool. Here each worker process is fed by its own
+    thread, and terminating one only fails the job it was running. The worker
+    is restarted for the next job.
+"""
+
+from concurrent import futures
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+import multiprocessing
+import queue
+import threading
+
+
+def _worker_main(conn) -> None:
+    """ Run the jobs sent over conn until it's closed or sent None
+    """
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        func, args = job
+        try:
+            result = (True, func(*args))
+        except BaseException as e:  # pylint: disable=broad-except
+            result = (False, e)
+        try:
+            conn.send(result)
+        except Exception as e:  # pylint: disable=broad-except
+            # The result couldn't be pickled
+            conn.send((False, e))
+
+
+class _Worker:
+    """ A worker process and the state its feeding thread shares with
+        ProcessPool.terminate
+    """
+    def __init__(self):
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.conn = None
+        self.killed = False
+
+
+class ProcessPool:
+    """ Fixed number of worker processes running submitted functions
+
+        submit() returns a concurrent.futures.Future like an Executor's. A job
+        whose worker dies or is terminated fails with BrokenProcessPool.
+    """
+    def __init__(self, size: int, mp_context=None):
+        self._context = mp_context or multiprocessing.get_context()
+        self._jobs: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._running: Dict[futures.Future, _Worker] = {}
+        self._shutdown = False
+        self._threads: List[threading.Thread] = [
+            threading.Thread(target=self._feed_worker,
+                             name='dash-multipage-process-{}'.format(i),
+                             daemon=True)
+            for i in range(size)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, func: Callable, *args) -> futures.Future:
+        """ Queue func(*args) to run in a worker process
+        """
+        future: futures.Future = futures.Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+            self._jobs.put((future, func, args))
+        return future
+
+    def terminate(self, future: futures.Future) -> bool:
+        """ Terminate the worker running future's job, which then fails with
+            BrokenProcessPool. Returns False if the job isn't running.
+        """
+        with self._lock:
+            worker = self._running.get(future)
+            if worker is None:
+                return False
+            worker.killed = True
+            worker.process.terminate()
+        return True
+
+    def shutdown(self, wait: bool = True) -> None:
+        """ Stop the workers once the queued jobs are done
+        """
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            for _ in self._threads:
+                self._jobs.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _start_process(self, worker: _Worker) -> None:
+        if worker.process is not None:
+            worker.conn.close()
+            worker.process.join()
+        worker.conn, child_conn = self._context.Pipe()
+        worker.process = self._context.Process(
+            target=_worker_main, args=(child_conn,), daemon=True)
+        worker.process.start()
+        child_conn.close()
+        worker.killed = False
+
+    def _run(self, worker: _Worker, future: futures.Future, func: Callable,
+             args: tuple) -> None:
+        try:
+            worker.conn.send((func, args))
+        except (EOFError, OSError):
+            worker.killed = True
+            future.set_exception(BrokenProcessPool('A worker process died'))
+            return
+        except Exception as e:  # pylint: disable=broad-except
+            # func or args couldn't be pickled, the worker is still fine
+            future.set_exception(e)
+            return
+        try:
+            ok, result = worker.conn.recv()
+        except (EOFError, OSError):
+            worker.killed = True
+            future.set_exception(BrokenProcessPool(
+                'The worker process running the job died or was terminated'))
+            return
+        if ok:
+            future.set_result(result)
+        else:
+            future.set_exception(result)
+
+    def _feed_worker(self) -> None:
+        worker = _Worker()
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            future, func, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                if worker.process is None or worker.killed:
+                    self._start_process(worker)
+                self._running[future] = worker
+            try:
+                self._run(worker, future, func, args)
+            finally:
+                with self._lock:
+                    del self._running[future]
+        if worker.process is not None:
+            try:
+                worker.conn.send(None)
+            except (EOFError, OSError):
+                pass
+            worker.process.join()
+            worker.conn.close()
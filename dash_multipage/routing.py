@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+""" Route table for dispatching URL paths to page controllers
+
+    Static paths are looked up in a dict. Paths with parameters such as
+    /runs/<run_id> are stored in a segment trie so a lookup costs O(path depth)
+    regardless of how many pages are registered.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from urllib import parse
+import re
+
+# A path segment of the form <name> captures that segment as a parameter
+_PARAM_RE = re.compile(r'^<([A-Za-z_][A-Za-z0-9_]*)>$')
+
+
+def is_pattern(page_path: str) -> bool:
+    """ Return True if the page path contains <name> parameter segments
+    """
+    return any(_PARAM_RE.match(segment) for segment in page_path.split('/'))
+
+
+class _Node:
+    """ A node in the route trie
+    """
+    __slots__ = ('static', 'param_name', 'param_child', 'target')
+
+    def __init__(self):
+        self.static: Dict[str, '_Node'] = {}
+        self.param_name: Optional[str] = None
+        self.param_child: Optional['_Node'] = None
+        self.target: Any = None
+
+
+class RouteTable:
+    """ Maps page paths to targets (normally controllers)
+
+        Routes are added once at construction time. Paths are matched exactly
+        unless they contain <name> segments, which match any single non-empty
+        segment and are returned as path parameters.
+    """
+
+    def __init__(self):
+        self._static: Dict[str, Any] = {}
+        self._root = _Node()
+        self.routes: List[Tuple[str, Any]] = []
+
+    def add(self, page_path: str, target: Any) -> None:
+        """ Add a route
+
+        Parameters
+        ----------
+        page_path : the url path starting with '/', optionally with <name> segments
+        target : object returned when the path matches
+        """
+        if not is_pattern(page_path):
+            if page_path in self._static:
+                raise ValueError('Duplicate route: {}'.format(page_path))
+            self._static[page_path] = target
+            self.routes.append((page_path, target))
+            return
+        node = self._root
+        for segment in page_path.split('/')[1:]:
+            param = _PARAM_RE.match(segment)
+            if param is None:
+                node = node.static.setdefault(segment, _Node())
+                continue
+            name = param.group(1)
+            if node.param_child is None:
+                node.param_name = name
+                node.param_child = _Node()
+            elif node.param_name != name:
+                raise ValueError(
+                    'Conflicting parameter names at {}: <{}> and <{}>'.format(
+                        page_path, node.param_name, name))
+            node = node.param_child
+        if node.target is not None:
+            raise ValueError('Duplicate route: {}'.format(page_path))
+        node.target = target
+        self.routes.append((page_path, target))
+
+    def match(self, path: str) -> Optional[Tuple[Any, Dict[str, str]]]:
+        """ Find the target for a path
+
+        Parameters
+        ----------
+        path : the url path as returned from parse_href
+
+        Returns
+        ----------
+        (target, dict) of the matched target and any path parameters, or None
+        """
+        try:
+            return self._static[path], {}
+        except KeyError:
+            pass
+        params: Dict[str, str] = {}
+        target = self._match_node(self._root, path.split('/')[1:], 0, params)
+        if target is None:
+            return None
+        return target, params
+
+    def _match_node(self, node: _Node, segments: List[str], index: int,
+                    params: Dict[str, str]) -> Any:
+        if index == len(segments):
+            return node.target
+        segment = segments[index]
+        child = node.static.get(segment)
+        if child is not None:
+            target = self._match_node(child, segments, index + 1, params)
+            if target is not None:
+                return target
+        if node.param_child is not None and segment:
+            target = self._match_node(
+                node.param_child, segments, index + 1, params)
+            if target is not None:
+                params[node.param_name] = parse.unquote(segment)
+                return target
+        return None
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+""" Server side storage of page state for short links
+
+    URLArgs can save the page state in a store and put only a short token in
+    the link box. MultiPageDashController looks the token up before calling the
+    page layout. Both need to be given the same store.
+"""
+
+from typing import Any, Optional
+import base64
+import hashlib
+
+from dash_multipage.cache import LRUCache, SQLiteCache
+
+
+def make_token(state: str) -> str:
+    """ Return a short token derived from a hash of the state
+    """
+    digest = hashlib.sha256(state.encode('utf-8')).digest()
+    return base64.urlsafe_b64encode(digest[:12]).decode('ascii')
+
+
+class StateStore:
+    """ Stores page state strings by token
+
+        Parameters
+        ----------
+        cache : backend with get(key, default) and put(key, value) methods
+            storing bytes values
+    """
+
+    def __init__(self, cache: Any):
+        self.cache = cache
+
+    def save(self, state: str) -> str:
+        """ Store the state and return its token
+        """
+        token = make_token(state)
+        self.cache.put(token, state.encode('utf-8'))
+        return token
+
+    def load(self, token: str) -> Optional[str]:
+        """ Return the state for a token, or None if it's unknown or expired
+        """
+        state = self.cache.get(token)
+        if state is None:
+            return None
+        return state.decode('utf-8')
+
+    def stats(self):
+        """ Return the backend's counters
+        """
+        return self.cache.stats()
+
+
+class MemoryStateStore(StateStore):
+    """ State store kept in this process's memory
+
+        Parameters
+        ----------
+        maxsize : maximum number of states to keep
+        ttl : seconds a state stays valid, or None to never expire
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = None):
+        super().__init__(LRUCache(maxsize, ttl))
+
+
+class SQLiteStateStore(StateStore):
+    """ State store in a local SQLite database that can be shared by the
+        worker processes on a host. See SQLiteCache for the parameters.
+
+        States expire after 30 days and at most max_rows are kept by default,
+        so the database doesn't grow without bound. None disables either.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = 30 * 24 * 3600,
+                 batch_size: int = 64, flush_interval: float = 0.5,
+                 max_rows: Optional[int] = 100000):
+        super().__init__(SQLiteCache(path, ttl, batch_size, flush_interval,
+                                     table='page_state', max_rows=max_rows))
@@ -2,18 +2,157 @@
 """ Code for managing page state through the URL
 """
 
-from typing import Dict, Union, List, Tuple, Any, NamedTuple
+from typing import Dict, Union, List, Tuple, Any, NamedTuple, Callable, Optional
 from urllib import parse
 from enum import Enum, auto
+import base64
+import copy
+import functools
 import json
+import logging
+import os
+import zlib
 
 from dash import Dash
+
+from dash_multipage.state_store import StateStore
 from dash.development.base_component import Component
 from dash.dependencies import Input, Output
 import dash_core_components as dcc
 import dash_html_components as html
 
 
+# Clientside version of _update_link_box. The %s are replaced with a JSON list
+# of the argument keys in callback input order, a JSON list of the keys with
+# JSON encoded values and the JSON encoded page path. Values are converted the
+# same way as the encoders and parse.urlencode in encode(), including Python's
+# float formatting. Strings with non-printable characters above U+00A0 are
+# quoted differently in lists and dicts.
+_CLIENTSIDE_LINK_BOX = r'''
+function() {
+    var keys = %s;
+    var jsonKeys = %s;
+    var pagePath = %s;
+    function pyRepr(val) {
+        if (typeof val === 'string') {
+            var quote = (val.indexOf("'") >= 0 && val.indexOf('"') < 0) ? '"' : "'";
+            var escaped = val.replace(/\\/g, '\\\\')
+                .replace(/\n/g, '\\n').replace(/\r/g, '\\r')
+                .replace(/\t/g, '\\t')
+                .replace(/[\x00-\x1f\x7f-\xa0]/g, function(c) {
+                    return '\\x' + ('0' + c.charCodeAt(0).toString(16)).slice(-2);
+                });
+            if (quote === "'") {
+                escaped = escaped.replace(/'/g, "\\'");
+            }
+            return quote + escaped + quote;
+        }
+        return pyStr(val);
+    }
+    function pyStr(val) {
+        if (val === null || val === undefined) {
+            return 'None';
+        }
+        if (val === true) {
+            return 'True';
+        }
+        if (val === false) {
+            return 'False';
+        }
+        if (Array.isArray(val)) {
+            return '[' + val.map(pyRepr).join(', ') + ']';
+        }
+        if (typeof val === 'object') {
+            return '{' + Object.keys(val).map(function(key) {
+                return pyRepr(key) + ': ' + pyRepr(val[key]);
+            }).join(', ') + '}';
+        }
+        if (typeof val === 'number') {
+            return pyNumber(val);
+        }
+        return String(val);
+    }
+    function pyNumber(val) {
+        // Integers up to 1e21 reach Python as ints, the rest as floats
+        if (!isFinite(val) || (Number.isInteger(val) && Math.abs(val) < 1e21)) {
+            return String(val);
+        }
+        var parts = val.toExponential().split('e');
+        var exp = parseInt(parts[1], 10);
+        if (exp >= -4 && exp < 16) {
+            return String(val);
+        }
+        var digits = String(Math.abs(exp));
+        return parts[0] + (exp < 0 ? 'e-' : 'e+') +
+            (digits.length < 2 ? '0' + digits : digits);
+    }
+    function pyJson(val) {
+        if (typeof val === 'number') {
+            return pyNumber(val);
+        }
+        if (Array.isArray(val)) {
+            return '[' + val.map(pyJson).join(',') + ']';
+        }
+        if (val !== null && typeof val === 'object') {
+            return '{' + Object.keys(val).map(function(key) {
+                return JSON.stringify(key) + ':' + pyJson(val[key]);
+            }).join(',') + '}';
+        }
+        return JSON.stringify(val);
+    }
+    function quotePlus(str) {
+        return encodeURIComponent(str).replace(/[!'()*]/g, function(c) {
+            return '%%' + c.charCodeAt(0).toString(16).toUpperCase();
+        }).replace(/%%20/g, '+');
+    }
+    var order = [];
+    var values = {};
+    for (var i = 0; i < keys.length; i++) {
+        if (!(keys[i] in values)) {
+            order.push(keys[i]);
+        }
+        values[keys[i]] = arguments[i];
+    }
+    var pairs = [];
+    order.forEach(function(key) {
+        var vals = values[key];
+        if (vals === null || vals === undefined) {
+            return;
+        }
+        if (!Array.isArray(vals)) {
+            vals = [vals];
+        }
+        var encode = jsonKeys.indexOf(key) >= 0 ? pyJson : pyStr;
+        vals.forEach(function(val) {
+            pairs.push(quotePlus(key) + '=' + quotePlus(encode(val)));
+        });
+    });
+    return pagePath + '?' + pairs.join('&');
+}
+'''
+
+
+# Query argument holding the whole page state in the compact encoding
+STATE_KEY = '_s'
+STATE_VERSION = '1'
+# Largest decompressed state accepted, so a small crafted link can't expand
+# into a huge allocation
+MAX_STATE_BYTES = 256 * 1024
+# Query argument holding a StateStore token
+TOKEN_KEY = '_t'
+
+
+class URLEncoding(Enum):
+    """ How URLArgs encodes page state in the URL
+
+        PLAIN: a query argument per key, repeated for lists
+        COMPACT: a single versioned argument with the zlib compressed, urlsafe
+            base64 encoded state. Much shorter for large lists and dicts.
+    """
+    PLAIN = auto()
+    COMPACT = auto()
+
+
 class ValueTypes(Enum):
     """ Types of values that can be read from url
     """
@@ -33,6 +172,72 @@ class ComponentInfo(NamedTuple):
     default: Any
 
 
+def _decode_str(str_list: List[str]) -> str:
+    return str_list[-1]
+
+
+def _decode_str_list(str_list: List[str]) -> List[str]:
+    return str_list
+
+
+def _decode_int(str_list: List[str]) -> int:
+    try:
+        return int(str_list[-1])
+    except ValueError:
+        # Accept integral floats like '3.0'
+        value = float(str_list[-1])
+        if not value.is_integer():
+            raise ValueError('{} is not an integer'.format(str_list[-1]))
+        return int(value)
+
+
+def _decode_float(str_list: List[str]) -> float:
+    return float(str_list[-1])
+
+
+def _decode_dict(str_list: List[str]) -> Dict:
+    str_val = str_list[-1]
+    try:
+        value = json.loads(str_val)
+    except json.JSONDecodeError:
+        # Links generated before DICT values were JSON encoded used str()
+        value = json.loads(str_val.replace("'", '"'))
+    if not isinstance(value, dict):
+        raise ValueError('{} is not a dict'.format(str_val))
+    return value
+
+
+def _encode_json(value: Any) -> str:
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+
+_DECODERS: Dict[ValueTypes, Callable[[List[str]], Any]] = {
+    ValueTypes.STR: _decode_str,
+    ValueTypes.STR_LIST: _decode_str_list,
+    ValueTypes.INT: _decode_int,
+    ValueTypes.FLOAT: _decode_float,
+    ValueTypes.DICT: _decode_dict,
+}
+
+# Encoders convert a single value (or list element) to a string
+_ENCODERS: Dict[ValueTypes, Callable[[Any], str]] = {
+    ValueTypes.STR: str,
+    ValueTypes.STR_LIST: str,
+    ValueTypes.INT: str,
+    ValueTypes.FLOAT: str,
+    ValueTypes.DICT: _encode_json,
+}
+
+
+class CompiledArg(NamedTuple):
+    """ A registered component with its precomputed URL key and conversions
+    """
+    info: ComponentInfo
+    key: str
+    decoder: Callable[[List[str]], Any]
+    encoder: Callable[[Any], str]
+
+
 class URLArgs:
     """ Class for managing loading values from URL, and generating a link box
         that gives a URL with the page's current state
@@ -44,15 +249,46 @@ class URLArgs:
             ie. MY_PAGE/input1 would have the namespace MY_PAGE
         page_path : str
             the base URL for the app ie. http://localhost:8080
+        clientside : bool
+            if True, the link box is updated by a clientside callback so typing
+            in the linked components makes no server requests. Requires a dash
+            version with clientside callback support.
+        encoding : URLEncoding
+            how the state is encoded in generated links. Both encodings are
+            always accepted when reading a URL. COMPACT can't be used with
+            clientside.
+        state_store : StateStore
+            if given, states with an encoded length over state_store_threshold
+            are saved in the store and the link contains only a short token.
+            The MultiPageDashController must be given the same store. Can't be
+            used with clientside.
+        state_store_threshold : int
+            encoded state length above which the state store is used. The
+            default keeps links under the 2000 characters browsers and
+            servers reliably accept, without writing a state for every edit
+            of a small page.
 
     """
 
-    def __init__(self, id_namespace: str, page_path: str):
+    def __init__(self, id_namespace: str, page_path: str, clientside=False,
+                 encoding=URLEncoding.PLAIN,
+                 state_store: Optional[StateStore] = None,
+                 state_store_threshold=2000):
+        if clientside and (encoding != URLEncoding.PLAIN or state_store):
+            raise ValueError('clientside link boxes only support PLAIN '
+                             'encoding without a state store')
         self.page_path = page_path
         self.id_namespace = id_namespace
+        self.clientside = clientside
+        self.encoding = encoding
+        self.state_store = state_store
+        self.state_store_threshold = state_store_threshold
         self.link_id = id_namespace + '/quick-link-box'
         self.link_id_workaround = self.link_id + '-workaround'
         self.linked_components: List[ComponentInfo] = []
+        self.logger = logging.getLogger(os.path.basename(__file__))
+        self._schema: Optional[List[CompiledArg]] = None
+        self._encoders: Dict[str, Callable[[Any], str]] = {}
 
     def register_component(
             self,
@@ -75,6 +311,7 @@ class URLArgs:
                 value,
                 value_type,
                 default))
+        self._schema = None
 
     @staticmethod
     def _get_key(component_id: Component) -> str:
@@ -83,14 +320,108 @@ class URLArgs:
     def generate_link_box(self) -> html.Div:
         """ Get layout of the link box for this page
         """
-        return html.Div([
+        link_box = [
             dcc.Input(
                 id=self.link_id,
                 type='text',
                 readOnly=True,
                 value='',),
-            html.Div(id=self.link_id_workaround, style={'display': 'none'}),
-        ])
+        ]
+        if not self.clientside:
+            link_box.append(
+                html.Div(id=self.link_id_workaround, style={'display': 'none'}))
+        return html.Div(link_box)
+
+    def _compile(self) -> None:
+        self._schema = [
+            CompiledArg(info, self._get_key(info.component.id),
+                        _DECODERS[info.value_type],
+                        _ENCODERS[info.value_type])
+            for info in self.linked_components]
+        self._encoders = {arg.key: arg.encoder for arg in self._schema}
+
+    @property
+    def schema(self) -> List[CompiledArg]:
+        """ The registered components compiled with their keys and conversions
+
+            Compiled on first use after a component is registered
+        """
+        if self._schema is None:
+            self._compile()
+        return self._schema
+
+    def _decode_values(self, args_dict: Dict[str, List[str]],
+                       strict: bool) -> List[Any]:
+        """ Return the value for each entry in the schema from the URL args,
+            or its default if missing or invalid
+        """
+        if STATE_KEY in args_dict:
+            args_dict = expand_state(args_dict)
+        values = []
+        errors = []
+        for arg in self.schema:
+            value = arg.info.default
+            str_list = args_dict.get(arg.key)
+            if str_list:
+                try:
+                    value = arg.decoder(str_list)
+                except ValueError as err:
+                    errors.append('{}: {}'.format(arg.key, err))
+            values.append(value)
+        if errors:
+            if strict:
+                raise ValueError(
+                    'Invalid URL arguments: {}'.format('; '.join(errors)))
+            self.logger.warning('Ignoring invalid URL arguments: %s',
+                                '; '.join(errors))
+        return values
+
+    def decode(self, args_dict: Dict[str, List[str]],
+               strict=False) -> Dict[str, Any]:
+        """ Convert URL args to the value for each registered key
+
+        Parameters
+        ----------
+        args_dict : query arguments as returned by parse_href
+        strict : if True raise ValueError for invalid values, otherwise log a
+            warning and use the default
+
+        Returns
+        ----------
+        dict, value for each registered key. Missing keys use the default
+        """
+        return {arg.key: value for arg, value in zip(
+            self.schema, self._decode_values(args_dict, strict))}
+
+    def encode(self, values: Dict[str, Any]) -> str:
+        """ Convert values keyed by registered key to a query string
+
+            None values are left out, and list values are encoded as repeated
+            keys, or lists in the COMPACT encoding.
+        """
+        if self._schema is None:
+            self._compile()
+        if self.encoding == URLEncoding.COMPACT:
+            state: Dict[str, List[str]] = {}
+            for key, vals in values.items():
+                if vals is None:
+                    continue
+                encoder = self._encoders.get(key, str)
+                if isinstance(vals, list):
+                    state[key] = [encoder(val) for val in vals]
+                else:
+                    state[key] = [encoder(vals)]
+            return parse.urlencode([(STATE_KEY, encode_state(state))])
+        pairs: List[Tuple[str, str]] = []
+        for key, vals in values.items():
+            if vals is None:
+                continue
+            encoder = self._encoders.get(key, str)
+            if isinstance(vals, list):
+                pairs.extend((key, encoder(val)) for val in vals)
+            else:
+                pairs.append((key, encoder(vals)))
+        return parse.urlencode(pairs)
 
     def _generate_url(self, kwargs: Dict[str, Union[str, List[str]]]) -> str:
         """Generates a page URL with state arguments
@@ -103,53 +434,63 @@ class URLArgs:
         ----------
         str, fully formatted URL
         """
-        tuples: Tuple = ()
-        for k, vals in kwargs.items():
-            if vals is None:
-                continue
-            if not isinstance(vals, list):
-                vals = [vals]
-            for val in vals:
-                tuples = tuples + ((k, val),)
-        arg_str = parse.urlencode(tuples)
+        arg_str = self.encode(kwargs)
+        if (self.state_store is not None
+                and len(arg_str) > self.state_store_threshold):
+            token = self.state_store.save(arg_str)
+            arg_str = parse.urlencode([(TOKEN_KEY, token)])
         return '{}?{}'.format(self.page_path, arg_str)
 
     def initialize_components(self, args_dict: Dict[str, List[str]]) -> None:
         """ Update components with the values from the Dict
 
             Should be called after all components are registered
+
+            This modifies the registered components, so it isn't safe to use
+            when requests are handled by multiple threads. Use
+            get_initialized_components instead.
         """
-        for component_info in self.linked_components:
-            component = component_info.component
-            value_name = component_info.value_name
-            key = self._get_key(component.id)
-            value = component_info.default
-            try:
-                str_list = args_dict[key]
-                if component_info.value_type == ValueTypes.STR_LIST:
-                    value = str_list
-                else:
-                    str_val = str_list[-1]
-                    if component_info.value_type == ValueTypes.STR:
-                        value = str_val
-                    else:
-                        try:
-                            if component_info.value_type == ValueTypes.INT:
-                                value = float(str_val)
-                            elif component_info.value_type == ValueTypes.FLOAT:
-                                value = float(str_val)
-                            elif component_info.value_type == ValueTypes.DICT:
-                                value = json.loads(str_val.replace("'", '"'))
-                        except (ValueError, json.JSONDecodeError):
-                            pass
-            except KeyError:
-                pass
-            setattr(component, value_name, value)
+        for arg, value in zip(self.schema,
+                              self._decode_values(args_dict, False)):
+            setattr(arg.info.component, arg.info.value_name, value)
+
+    def get_initialized_components(
+            self, args_dict: Dict[str, List[str]]) -> Dict[str, Component]:
+        """ Return copies of the registered components with the values from the
+            Dict, keyed by component id
+
+            The registered components aren't modified, so this is safe to call
+            from multiple threads. Use the copies in place of the registered
+            components when building the layout.
+
+            Should be called after all components are registered
+        """
+        components = {}
+        for arg, value in zip(self.schema,
+                              self._decode_values(args_dict, False)):
+            component = copy.copy(arg.info.component)
+            setattr(component, arg.info.value_name, value)
+            components[component.id] = component
+        return components
 
     def register_callbacks(self, app: Dash) -> None:
         """ Add the callbacks for the components and link box to the app
             Should only be called after all the components are registered
         """
+        if self.clientside:
+            # The workaround below isn't needed since clientside callbacks
+            # don't make a request when the link box changes
+            keys = [arg.key for arg in self.schema]
+            json_keys = [arg.key for arg in self.schema
+                         if arg.encoder is _encode_json]
+            app.clientside_callback(
+                _CLIENTSIDE_LINK_BOX % (json.dumps(keys),
+                                        json.dumps(json_keys),
+                                        json.dumps(self.page_path)),
+                Output(self.link_id, 'value'),
+                [Input(info.component.id, info.value_name)
+                 for info in self.linked_components])
+            return
         # Workaround for
         # https://github.com/plotly/dash-core-components/issues/430
         @app.callback(Output(self.link_id_workaround, 'children'),
@@ -168,12 +509,101 @@ class URLArgs:
 
             """
             kwargs = {
-                self._get_key(
-                    info.component.id): arg for info, arg in zip(
-                        self.linked_components, args)}
+                arg.key: value for arg, value in zip(self.schema, args)}
             return self._generate_url(kwargs)
 
 
+def encode_state(args_dict: Dict[str, List[str]]) -> str:
+    """ Encode query arguments as a compact state string
+
+        Single values are stored without a list, then the JSON is compressed
+        and urlsafe base64 encoded with a version prefix.
+    """
+    state = {key: vals[0] if len(vals) == 1 else vals
+             for key, vals in args_dict.items()}
+    data = json.dumps(state, separators=(',', ':'), ensure_ascii=False)
+    compressed = zlib.compress(data.encode('utf-8'), 9)
+    return '{}.{}'.format(
+        STATE_VERSION,
+        base64.urlsafe_b64encode(compressed).decode('ascii').rstrip('='))
+
+
+def decode_state(state_str: str) -> Dict[str, List[str]]:
+    """ Decode a string from encode_state back into query arguments
+
+        Raises ValueError if the string is invalid or decompresses to more
+        than MAX_STATE_BYTES
+    """
+    # Copied since the cached lists are shared
+    return {key: list(vals) for key, vals in _decode_state(state_str).items()}
+
+
+# A page load decodes the same state several times
+@functools.lru_cache(maxsize=64)
+def _decode_state(state_str: str) -> Dict[str, List[str]]:
+    version, _, payload = state_str.partition('.')
+    if version != STATE_VERSION:
+        raise ValueError('Unsupported URL state version: {}'.format(version))
+    try:
+        compressed = base64.urlsafe_b64decode(
+            payload + '=' * (-len(payload) % 4))
+        decompressor = zlib.decompressobj()
+        data = decompressor.decompress(compressed, MAX_STATE_BYTES)
+        if decompressor.unconsumed_tail:
+            raise ValueError('Invalid URL state: over {} bytes'.format(
+                MAX_STATE_BYTES))
+        if not decompressor.eof:
+            raise ValueError('Invalid URL state: truncated')
+        state = json.loads(data.decode('utf-8'))
+    except (zlib.error, UnicodeDecodeError) as err:
+        raise ValueError('Invalid URL state: {}'.format(err))
+    if not isinstance(state, dict):
+        raise ValueError('Invalid URL state: not a dict')
+    args_dict = {}
+    for key, vals in state.items():
+        vals = vals if isinstance(vals, list) else [vals]
+        if not all(isinstance(val, str) for val in vals):
+            raise ValueError('Invalid URL state: {} is not a string or list '
+                             'of strings'.format(key))
+        args_dict[key] = vals
+    return args_dict
+
+
+def expand_state(args_dict: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """ Replace a compact state argument with the arguments it contains
+
+        Arguments given directly in the query take precedence over those in
+        the state.
+    """
+    args_dict = dict(args_dict)
+    state_strs = args_dict.pop(STATE_KEY, None)
+    if not state_strs:
+        return args_dict
+    state = decode_state(state_strs[-1])
+    state.update(args_dict)
+    return state
+
+
+def resolve_state(args_dict: Dict[str, List[str]],
+                  state_store: StateStore) -> Dict[str, List[str]]:
+    """ Replace a StateStore token argument with the arguments it refers to
+
+        Raises KeyError if the token is unknown or expired
+    """
+    args_dict = dict(args_dict)
+    tokens = args_dict.pop(TOKEN_KEY, None)
+    if not tokens:
+        return args_dict
+    state_str = state_store.load(tokens[-1])
+    if state_str is None:
+        raise KeyError('Unknown URL state token: {}'.format(tokens[-1]))
+    state = parse.parse_qs(state_str)
+    if STATE_KEY in state:
+        state = expand_state(state)
+    state.update(args_dict)
+    return state
+
+
 def parse_href(href: str) -> Tuple[str, Dict[str, List[str]]]:
     """Parses a href from Dash.
 
@@ -183,6 +613,9 @@ def parse_href(href: str) -> Tuple[str, Dict[str, List[str]]]:
     would be treated as arg1: [val1, val2]. See:
     https://docs.python.org/2/library/urlparse.html#urlparse.parse_qs
 
+    A compact state argument (see URLEncoding) is expanded into the arguments
+    it contains.
+
     Parameters
     ----------
     href : str
@@ -197,4 +630,6 @@ def parse_href(href: str) -> Tuple[str, Dict[str, List[str]]]:
         return ('', {})
     result = parse.urlparse(href)
     url_args = parse.parse_qs(result.query)
+    if STATE_KEY in url_args:
+        url_args = expand_state(url_args)
     return result.path, url_args
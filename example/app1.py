@@ -11,7 +11,7 @@ import dash_html_components as html
 from dash_multipage import URLArgs
 from dash_multipage import ControllerBase
 from dash_multipage import LinkInfo
-from dash_multipage import Input, Output, State
+from dash_multipage import Input, Output, State, memoize
 
 
 class App1(ControllerBase):
@@ -45,13 +45,14 @@ class App1(ControllerBase):
 
     def layout(self, args: Dict):
         """ layout the components in app1"""
-        self.url_args.initialize_components(args)
+        # Copies are used so concurrent requests don't share component values
+        components = self.url_args.get_initialized_components(args)
         link_box = self.url_args.generate_link_box()
         return html.Div([
             html.H2('Page 1'),
             link_box,
-            self.input1,
-            self.input2,
+            components[self.input1.id],
+            components[self.input2.id],
             self.button,
             self.output,
         ])
@@ -69,6 +70,7 @@ class App1(ControllerBase):
         @app.callback(Output(self.output, 'children'),
                       [Input(self.button, 'n_clicks')],
                       [State(self.input1, 'value'), State(self.input2, 'value')])
+        @memoize()
         def _update_output(n_clicks, input1, input2):
             return ('The Button has been pressed {} times,'
                     'Input 1 is "{}",'
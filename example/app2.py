@@ -12,6 +12,7 @@ from dash_multipage import URLArgs
 from dash_multipage import ControllerBase
 from dash_multipage import LinkInfo
 from dash_multipage import Input, Output
+from dash_multipage import freeze
 
 
 class App2(ControllerBase):
@@ -23,18 +24,20 @@ class App2(ControllerBase):
 
         self.drop = dcc.Dropdown(
             id=id_namespace + 'dropdown',
-            options=[{'label': i, 'value': i} for i in ['LA', 'NYC', 'MTL']]
+            # The options never change, so cached layouts can share them
+            options=freeze([{'label': i, 'value': i}
+                            for i in ['LA', 'NYC', 'MTL']])
         )
         self.url_args.register_component(self.drop, default='LA')
         self.display = html.Div(id=id_namespace + '/display-value')
 
     def layout(self, args: Dict):
-        self.url_args.initialize_components(args)
+        components = self.url_args.get_initialized_components(args)
         link_box = self.url_args.generate_link_box()
         return html.Div([
             html.H2('Page 2'),
             link_box,
-            self.drop,
+            components[self.drop.id],
             self.display,
         ])
 
@@ -2,10 +2,9 @@
 
 import dash
 
-from dash_multipage import MultiPageDashController
+from dash_multipage import MultiPageDashController, LazyController, LinkInfo
 
 from app1 import App1
-from app2 import App2
 from footer import render_footer
 from error_404 import render_404
 
@@ -21,8 +20,12 @@ APP.title = "Multipage Dash Example"
 # This is how the URLS to initialize the app page states will start
 HOST_PATH = 'http://localhost:5000'
 
-# List of controllers for the app pages
-VIEW_CTRLS = [App1(HOST_PATH), App2(HOST_PATH)]
+# List of controllers for the app pages. App2 is only imported and created
+# when first needed, which keeps startup fast for pages that are slow to load.
+VIEW_CTRLS = [
+    App1(HOST_PATH),
+    LazyController(LinkInfo('App2', '/app2', 'app2'), 'app2:App2', HOST_PATH),
+]
 
 # Initialize the multipage App
 PAGE_CTRL = MultiPageDashController(
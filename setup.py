@@ -28,6 +28,7 @@ setup(
         'dash-core-components'
     ],
     license='MIT',
+    python_requires='>=3.6',
     classifiers=[
         'Development Status :: 4 - Beta',
         'Intended Audience :: Developers',
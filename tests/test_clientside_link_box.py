@@ -0,0 +1,70 @@
+""" The clientside link box must generate the same URLs as the server side one
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import dash_core_components as dcc
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position,protected-access
+from dash_multipage.url_arg_manager import (_CLIENTSIDE_LINK_BOX, URLArgs,
+                                            ValueTypes, _encode_json)
+
+CASES = [
+    ['text', ['a', 'b c'], 3, 0.5, {'a': 1}],
+    ["it's", ["it's", 'say "hi"'], -7, 1e-07, {'q': "it's \"quoted\""}],
+    ['both \' and "', [], 0, 1.5e-05, {'n': 1e-07, 'm': [1e+21, 0.0001]}],
+    ['a&b=c d+e/?#%', ['%20', '+'], 12, 123.456, {'nested': {'x': None}}],
+    ['üñí', ['tab\there', 'new\nline'], None, 1e+21, {'t': True, 'f': False}],
+    [None, None, 1, 1e16, {}],
+    [['x', 1e-07, None], [['y', 2.5e-08]], 5, 2.5,
+     {'s': 'é', 'c': 'a\x01b'}],
+    [{'k': 'v', 'n': 1.5e-05, "it's": None}, [{'a': [1, 'b']}], 2, -1e-05,
+     {'list': ['x', 1.25]}],
+    ['\x00\x7f\xa0', ['\\'], 3, 0.1, {'e': ''}],
+]
+
+
+def _url_args() -> URLArgs:
+    url_args = URLArgs('page', 'http://localhost/page', clientside=True)
+    url_args.register_component(dcc.Input(id='page/text'))
+    url_args.register_component(dcc.Dropdown(id='page/multi', multi=True),
+                                value_type=ValueTypes.STR_LIST)
+    url_args.register_component(dcc.Input(id='page/count', type='number'),
+                                value_type=ValueTypes.INT)
+    url_args.register_component(dcc.Input(id='page/scale', type='number'),
+                                value_type=ValueTypes.FLOAT)
+    url_args.register_component(dcc.Store(id='page/options'), value='data',
+                                value_type=ValueTypes.DICT)
+    return url_args
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='needs node')
+def test_clientside_urls_match_server():
+    url_args = _url_args()
+    keys = [arg.key for arg in url_args.schema]
+    json_keys = [arg.key for arg in url_args.schema
+                 if arg.encoder is _encode_json]
+    function = _CLIENTSIDE_LINK_BOX % (json.dumps(keys), json.dumps(json_keys),
+                                       json.dumps(url_args.page_path))
+    # The browser sends the values the callback sees to the server as JSON,
+    # so the server side gets them as parsed from JSON.stringify
+    script = '''
+var linkBox = (%s);
+var cases = %s;
+console.log(JSON.stringify(cases.map(function(values) {
+    return {url: linkBox.apply(null, values), values: JSON.stringify(values)};
+})));
+''' % (function, json.dumps(CASES))
+    output = subprocess.run(['node', '-e', script], check=True,
+                            stdout=subprocess.PIPE).stdout
+    for result in json.loads(output):
+        values = json.loads(result['values'])
+        expected = url_args._generate_url(dict(zip(keys, values)))
+        assert result['url'] == expected, values
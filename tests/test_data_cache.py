@@ -0,0 +1,32 @@
+""" Background refresh of the DataCache
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from dash_multipage.data_cache import DataCache
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_refresh_after_shutdown_restarts_threads():
+    calls = []
+    cache = DataCache()
+    cache.register('data', lambda: calls.append(1) or len(calls), ttl=0.2,
+                   refresh_ahead=0.2)
+    assert cache.get('data') == 1
+    cache.shutdown()
+    # Inside the refresh window, so this starts a background refresh
+    assert cache.get('data') == 1
+    assert _wait_for(lambda: cache.stats()['refreshes'] == 1)
+    assert cache.get('data') == 2
+    cache.shutdown()
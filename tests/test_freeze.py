@@ -0,0 +1,31 @@
+""" Sharing of frozen layout parts between snapshots
+"""
+
+import gc
+import os
+import sys
+
+import dash_html_components as html
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from dash_multipage.cache import freeze, frozen_objects, snapshot_layout
+
+
+def test_snapshots_share_frozen_parts():
+    heading = freeze(html.H1('Title'))
+    options = freeze([{'label': 'a', 'value': 'a'}])
+    first = snapshot_layout(html.Div([heading, html.P(id='p')]))
+    second = snapshot_layout(html.Div([heading, html.P(id='q')]))
+    assert first['props']['children'][0] is second['props']['children'][0]
+    assert options == [{'label': 'a', 'value': 'a'}]
+
+
+def test_frozen_objects_are_not_kept_alive():
+    before = len(frozen_objects())
+    for _ in range(100):
+        freeze(html.H2('per request'))
+        freeze([1, 2, 3])
+    gc.collect()
+    assert len(frozen_objects()) == before
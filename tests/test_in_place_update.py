@@ -0,0 +1,130 @@
+""" Pages with update_in_place set keep their layout when only the query
+    changes, and update their URLArgs components instead
+"""
+
+import json
+import os
+import sys
+from typing import Dict
+
+import dash
+import dash_core_components as dcc
+import dash_html_components as html
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from dash_multipage import (ControllerBase, Input, LinkInfo,
+                            MultiPageDashController, Output, URLArgs)
+
+DISPLAY_PAGE = '..page-content.children...page-route.data..'
+
+
+class _Page(ControllerBase):
+    update_in_place = True
+
+    def __init__(self, link_id):
+        self.link_id = link_id
+        self.url_args = URLArgs(link_id, '/' + link_id)
+        self.city = dcc.Input(id=link_id + '/city')
+        self.url_args.register_component(self.city, default='LA')
+        self.display = html.Div(id=link_id + '/display')
+
+    def layout(self, args: Dict):
+        components = self.url_args.get_initialized_components(args)
+        return html.Div([components[self.city.id], self.display])
+
+    def get_link_info(self) -> LinkInfo:
+        return LinkInfo(self.link_id, '/' + self.link_id, self.link_id)
+
+    def register_callbacks(self, app):
+        self.url_args.register_callbacks(app)
+
+        @app.callback(Output(self.display, 'children'),
+                      [Input(self.city, 'value')])
+        def _display(value):
+            return value
+
+
+class _OutputPage(_Page):
+    """ Its URLArgs component is the output of another callback, so it can't
+        be updated in place
+    """
+
+    def register_callbacks(self, app):
+        super().register_callbacks(app)
+
+        @app.callback(Output(self.city, 'value'),
+                      [Input(self.display, 'n_clicks')])
+        def _reset(_):
+            return 'LA'
+
+
+@pytest.fixture(name='page_ctrl')
+def _page_ctrl():
+    app = dash.Dash(__name__)
+    return MultiPageDashController(app, [_Page('a'), _OutputPage('b')],
+                                   html.Div(), health_path=None)
+
+
+@pytest.fixture(name='client')
+def _client(page_ctrl):
+    client = page_ctrl.app.server.test_client()
+    client.get('/')
+    return client
+
+
+def _post(client, output, outputs, href, state):
+    response = client.post('/_dash-update-component', json={
+        'output': output, 'outputs': outputs,
+        'inputs': [{'id': 'url', 'property': 'href', 'value': href}],
+        'state': state, 'changedPropIds': ['url.href']})
+    if response.status_code == 204:
+        return None
+    assert response.status_code == 200
+    return json.loads(response.data)['response']
+
+
+def _display_page(client, href, route):
+    return _post(client, DISPLAY_PAGE,
+                 [{'id': 'page-content', 'property': 'children'},
+                  {'id': 'page-route', 'property': 'data'}],
+                 href, [{'id': 'page-route', 'property': 'data',
+                         'value': route}])
+
+
+def _update_in_place(client, href, value):
+    return _post(client, '..a/city.value..',
+                 [{'id': 'a/city', 'property': 'value'}], href,
+                 [{'id': 'a/city', 'property': 'value', 'value': value}])
+
+
+def test_pages_with_other_outputs_are_rendered_again(page_ctrl):
+    assert page_ctrl.in_place_ids == {'a'}
+
+
+def test_query_change_keeps_the_page(client):
+    response = _display_page(client, 'http://h/a?city=NYC', None)
+    assert response['page-route'] == {'data': '/a'}
+    assert response['page-content']['children'] is not None
+    assert _display_page(client, 'http://h/a?city=MTL', '/a') is None
+
+
+def test_other_pages_are_rendered(client):
+    response = _display_page(client, 'http://h/b?city=NYC', '/a')
+    assert response['page-route'] == {'data': None}
+    response = _display_page(client, 'http://h/b?city=MTL', None)
+    assert response['page-content']['children'] is not None
+
+
+def test_changed_values_are_set(client):
+    assert _update_in_place(client, 'http://h/a?city=MTL', 'NYC') == {
+        'a/city': {'value': 'MTL'}}
+    assert _update_in_place(client, 'http://h/a?city=MTL', 'MTL') is None
+    assert _update_in_place(client, 'http://h/a', 'NYC') == {
+        'a/city': {'value': 'LA'}}
+
+
+def test_leaving_the_page_changes_nothing(client):
+    assert _update_in_place(client, 'http://h/b?city=MTL', 'NYC') is None
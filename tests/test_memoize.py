@@ -0,0 +1,71 @@
+""" Caching and coalescing of memoized callbacks
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from dash_multipage.callbacks import memoize
+
+
+def test_concurrent_calls_share_one_computation():
+    calls = []
+    release = threading.Event()
+
+    @memoize()
+    def slow(value):
+        calls.append(value)
+        release.wait(5)
+        return value * 2
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(slow(4)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # Wait until the other threads are waiting on the first one's call
+    for _ in range(500):
+        if slow.cache_stats()['coalesced'] == 7:
+            break
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [4]
+    assert results == [8] * 8
+    assert slow.cache_stats()['coalesced'] == 7
+
+
+def _make_callback(path, offset, namespace):
+    @memoize(shared_path=path, namespace=namespace)
+    def _callback(value):
+        return value + offset
+    return _callback
+
+
+def test_shared_namespaces_are_separate(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    assert _make_callback(path, 1, 'first')(1) == 2
+    assert _make_callback(path, 2, 'second')(1) == 3
+    assert _make_callback(path, 1, 'first')(1) == 2
+
+
+def test_shared_results_depend_on_the_code(tmp_path):
+    path = str(tmp_path / 'cache.db')
+
+    def define(version):
+        if version == 1:
+            def _callback(value):
+                return value + 1
+        else:
+            def _callback(value):
+                return value + 2
+        _callback.__qualname__ = 'callback'
+        return memoize(shared_path=path)(_callback)
+
+    assert define(1)(1) == 2
+    assert define(2)(1) == 3
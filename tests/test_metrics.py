@@ -0,0 +1,28 @@
+""" Error counting of timed callbacks
+"""
+
+import os
+import sys
+
+from dash.exceptions import PreventUpdate
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from dash_multipage.metrics import Metrics
+
+
+@pytest.mark.parametrize('error, errors', [(PreventUpdate, 0),
+                                           (ValueError, 1)])
+def test_callback_errors(error, errors):
+    metrics = Metrics()
+
+    def _callback():
+        raise error()
+
+    with pytest.raises(error):
+        metrics.wrap_callback(_callback, 'cb')()
+    summary = metrics.summary()['callback_seconds']['cb']
+    assert summary['count'] == 1
+    assert summary['errors'] == errors
@@ -0,0 +1,83 @@
+""" The browser side page cache shows visited pages without server requests
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position,protected-access
+from dash_multipage.multipage_controller import _CLIENTSIDE_PAGE_CACHE
+
+PAGES = {'/a': 'a', '/b': 'b', '/c': 'c'}
+HIDDEN = {'display': 'none'}
+
+pytestmark = pytest.mark.skipif(shutil.which('node') is None,
+                                reason='needs node')
+
+
+def _navigate(hrefs, max_pages=2):
+    """ Run the cache callback for each href in turn, feeding its cache
+        output back in, and return the outputs with no_update as None
+    """
+    function = _CLIENTSIDE_PAGE_CACHE % (json.dumps(PAGES), max_pages)
+    script = '''
+var noUpdate = {};
+var window = {dash_clientside: {no_update: noUpdate}};
+var URL = require('url').URL;
+var callback = (%s);
+var cache = null;
+console.log(JSON.stringify(%s.map(function(href) {
+    var outputs = callback(href, cache);
+    if (outputs[0] !== noUpdate) {
+        cache = JSON.parse(JSON.stringify(outputs[0]));
+    }
+    return outputs.map(function(output) {
+        return output === noUpdate ? null : output;
+    });
+})));
+''' % (function, json.dumps(hrefs))
+    output = subprocess.run(['node', '-e', script], check=True,
+                            stdout=subprocess.PIPE).stdout
+    return [{'request': outputs[1], 'content_style': outputs[2],
+             'styles': dict(zip(PAGES.values(), outputs[3:]))}
+            for outputs in json.loads(output)]
+
+
+def test_revisiting_a_page_needs_no_request():
+    first, other, back = _navigate(['http://h/a?x=1', 'http://h/b',
+                                    'http://h/a?x=1'])
+    assert first['request']['target'] == 'a'
+    assert first['content_style'] == HIDDEN
+    assert first['styles'] == {'a': {}, 'b': HIDDEN, 'c': HIDDEN}
+    assert other['request']['target'] == 'b'
+    assert back['request'] is None
+    assert back['styles'] == {'a': {}, 'b': HIDDEN, 'c': HIDDEN}
+
+
+def test_new_arguments_render_the_page_again():
+    first, changed = _navigate(['http://h/a?x=1', 'http://h/a?x=2'])
+    assert changed['request']['target'] == 'a'
+    assert changed['request']['href'] == 'http://h/a?x=2'
+    assert changed['request']['n'] > first['request']['n']
+
+
+def test_uncached_pages_use_the_page_content():
+    (result,) = _navigate(['http://h/runs/1'])
+    assert result['request']['target'] is None
+    assert result['content_style'] == {}
+    assert all(style == HIDDEN for style in result['styles'].values())
+
+
+def test_least_recently_used_page_is_evicted():
+    results = _navigate(['http://h/a', 'http://h/b', 'http://h/a',
+                         'http://h/c', 'http://h/b'])
+    assert results[3]['request']['evict'] == ['b']
+    # b was unmounted, so it's rendered again
+    assert results[4]['request']['target'] == 'b'
+    assert results[4]['request']['evict'] == ['a']
@@ -0,0 +1,84 @@
+""" Matching of page paths with the route table
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from dash_multipage.routing import RouteTable, is_pattern
+
+
+@pytest.fixture
+def table():
+    routes = RouteTable()
+    for path in ['/', '/runs', '/runs/latest', '/runs/<run_id>',
+                 '/runs/<run_id>/plots/<plot>', '/runs/<run_id>/summary',
+                 '/users/<name>/runs/latest']:
+        routes.add(path, path)
+    return routes
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('/', ('/', {})),
+    ('/runs', ('/runs', {})),
+    ('/runs/42', ('/runs/<run_id>', {'run_id': '42'})),
+    ('/runs/42/plots/loss', ('/runs/<run_id>/plots/<plot>',
+                             {'run_id': '42', 'plot': 'loss'})),
+    ('/runs/42/summary', ('/runs/<run_id>/summary', {'run_id': '42'})),
+    ('/users/ann/runs/latest', ('/users/<name>/runs/latest',
+                                {'name': 'ann'})),
+])
+def test_match(table, path, expected):
+    assert table.match(path) == expected
+
+
+def test_static_segments_take_precedence(table):
+    assert table.match('/runs/latest') == ('/runs/latest', {})
+
+
+def test_backtracks_from_static_to_parameter():
+    routes = RouteTable()
+    routes.add('/a/b/c', 'static')
+    routes.add('/a/<x>/d', 'param')
+    assert routes.match('/a/b/d') == ('param', {'x': 'b'})
+    assert routes.match('/a/b/c') == ('static', {})
+
+
+@pytest.mark.parametrize('path', ['/missing', '/runs/', '/runs/42/plots',
+                                  '/runs/42/plots/loss/extra', '/runs//summary'])
+def test_no_match(table, path):
+    assert table.match(path) is None
+
+
+def test_parameters_are_unquoted(table):
+    assert table.match('/runs/a%20b%2Fc') == ('/runs/<run_id>',
+                                              {'run_id': 'a b/c'})
+
+
+def test_failed_branches_leave_no_parameters():
+    routes = RouteTable()
+    routes.add('/a/<x>/c', 'first')
+    routes.add('/<y>/b/d', 'second')
+    assert routes.match('/a/b/d') == ('second', {'y': 'a'})
+
+
+@pytest.mark.parametrize('first, second', [
+    ('/runs', '/runs'),
+    ('/runs/<run_id>', '/runs/<run_id>'),
+    ('/runs/<run_id>', '/runs/<other>'),
+])
+def test_rejects_duplicate_and_conflicting_routes(first, second):
+    routes = RouteTable()
+    routes.add(first, 'first')
+    with pytest.raises(ValueError):
+        routes.add(second, 'second')
+
+
+def test_is_pattern():
+    assert is_pattern('/runs/<run_id>')
+    assert not is_pattern('/runs/<run_id')
+    assert not is_pattern('/runs')
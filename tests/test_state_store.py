@@ -0,0 +1,42 @@
+""" Expiry and size bound of the SQLite state store
+"""
+
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from dash_multipage.state_store import SQLiteStateStore
+
+
+def _rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM page_state').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_keeps_newest_max_rows(tmp_path):
+    path = str(tmp_path / 'state.db')
+    store = SQLiteStateStore(path, max_rows=20, batch_size=8)
+    tokens = [store.save('state {}'.format(i)) for i in range(100)]
+    store.cache.flush()
+    assert _rows(path) == 20
+    assert store.load(tokens[-1]) == 'state 99'
+    assert store.load(tokens[0]) is None
+
+
+def test_expired_states_are_removed(tmp_path):
+    path = str(tmp_path / 'state.db')
+    store = SQLiteStateStore(path, ttl=0.05, max_rows=None)
+    token = store.save('old')
+    store.cache.flush()
+    time.sleep(0.1)
+    assert store.load(token) is None
+    store.save('new')
+    store.cache.flush()
+    assert _rows(path) == 1
@@ -0,0 +1,73 @@
+""" Concurrent renders of URLArgs pages must each show their own URL's values
+"""
+
+from concurrent import futures
+import json
+import os
+import sys
+import threading
+
+import dash
+import dash_html_components as html
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'example'))
+
+# pylint: disable=wrong-import-position
+from app1 import App1
+from app2 import App2
+from dash_multipage import MultiPageDashController
+
+HOST = 'http://localhost'
+REQUESTS = 400
+THREADS = 16
+
+
+def _component_values(node, found=None):
+    """ Return the props of each component with an id in a serialised layout
+    """
+    if found is None:
+        found = {}
+    if isinstance(node, list):
+        for child in node:
+            _component_values(child, found)
+    elif isinstance(node, dict):
+        props = node.get('props', {})
+        if 'id' in props:
+            found[props['id']] = props
+        _component_values(props.get('children'), found)
+    return found
+
+
+def test_conflicting_urls_from_threads():
+    app = dash.Dash(__name__)
+    MultiPageDashController(app, [App1(HOST), App2(HOST)], html.Div(),
+                            warm_up=False, health_path=None)
+    app.server.test_client().get('/')
+    local = threading.local()
+
+    def render(i):
+        if not hasattr(local, 'client'):
+            local.client = app.server.test_client()
+        if i % 2:
+            url = '{}/?input-1-state=city{}&input-2-state=country{}'.format(
+                HOST, i, i)
+            expected = {'app1/input-1-state': 'city{}'.format(i),
+                        'app1/input-2-state': 'country{}'.format(i)}
+        else:
+            city = ['LA', 'NYC', 'MTL'][i % 3]
+            url = '{}/app2?app2dropdown={}'.format(HOST, city)
+            expected = {'app2dropdown': city}
+        response = local.client.post('/_dash-update-component', json={
+            'output': 'page-content.children',
+            'outputs': {'id': 'page-content', 'property': 'children'},
+            'inputs': [{'id': 'url', 'property': 'href', 'value': url}],
+            'changedPropIds': ['url.href']})
+        assert response.status_code == 200
+        components = _component_values(json.loads(
+            response.data)['response']['page-content']['children'])
+        return {key: components[key]['value'] for key in expected}, expected
+
+    with futures.ThreadPoolExecutor(THREADS) as pool:
+        for values, expected in pool.map(render, range(REQUESTS)):
+            assert values == expected
@@ -0,0 +1,41 @@
+""" Decoding of the compact URL state
+"""
+
+import base64
+import os
+import sys
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from dash_multipage.url_arg_manager import (MAX_STATE_BYTES, decode_state,
+                                            encode_state)
+
+
+def test_round_trip():
+    args = {'city': ['NYC'], 'tags': ['a', 'b'], 'opts': ['{"x":1}']}
+    assert decode_state(encode_state(args)) == args
+
+
+@pytest.mark.parametrize('value', [{'a': 1}, 1, None, ['a', 2], [['a']]])
+def test_rejects_values_that_are_not_strings(value):
+    with pytest.raises(ValueError):
+        decode_state(encode_state({'d': [value]}))
+
+
+def test_rejects_states_that_decompress_too_far():
+    # A few KB that would inflate to several MB
+    data = b'{"a":"' + b'x' * (MAX_STATE_BYTES * 20) + b'"}'
+    payload = base64.urlsafe_b64encode(zlib.compress(data, 9)).decode('ascii')
+    assert len(payload) < 20000
+    with pytest.raises(ValueError):
+        decode_state('1.' + payload)
+
+
+def test_decoded_states_are_not_shared():
+    state = encode_state({'a': ['1']})
+    decode_state(state)['a'].append('2')
+    assert decode_state(state) == {'a': ['1']}